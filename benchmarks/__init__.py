@@ -0,0 +1,12 @@
+"""Benchmarks of the safedelete hot paths.
+
+Run them with::
+
+    python -m benchmarks --output results.json
+
+By default, the benchmarks run on SQLite, then on PostgreSQL if ``psycopg2``
+is installed and a local server is reachable. The PostgreSQL connection is
+configured with the usual ``PGHOST``, ``PGPORT``, ``PGUSER``, ``PGPASSWORD``
+and ``PGDATABASE`` environment variables. A test database is created and
+destroyed for each run.
+"""
@@ -0,0 +1,137 @@
+"""Run the benchmarks and write the results as JSON.
+
+    python -m benchmarks [--database {auto,sqlite,postgresql}] [--scale N]
+                         [--repeat N] [--case SUBSTRING] [--output FILE]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Timer(object):
+    """Measure the elapsed time and the queries run within a ``with`` block."""
+
+    def __init__(self, connection):
+        from django.test.utils import CaptureQueriesContext
+
+        self.queries = CaptureQueriesContext(connection)
+        self.elapsed = None
+
+    def __enter__(self):
+        self.queries.__enter__()
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.start
+        self.queries.__exit__(*exc_info)
+
+
+def run(args):
+    """Run the benchmarks on the database configured by the settings, return the results."""
+    import django
+    from django.db import connection, transaction
+
+    django.setup()
+
+    import safedelete
+    from benchmarks.cases import CASES
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    results = []
+    try:
+        for name, func in CASES:
+            if args.case and args.case not in name:
+                continue
+            timings = []
+            queries = None
+            for i in range(args.repeat):
+                timer = Timer(connection)
+                with transaction.atomic():
+                    func(timer, args.scale)
+                    transaction.set_rollback(True)
+                timings.append(timer.elapsed)
+                queries = len(timer.queries)
+            results.append({
+                'name': name,
+                'min': min(timings),
+                'median': statistics.median(timings),
+                'queries': queries,
+            })
+            print('{0:<50} {1:>10.4f}s {2:>8} queries'.format(name, min(timings), queries), file=sys.stderr)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    return {
+        'database': connection.vendor,
+        'scale': args.scale,
+        'repeat': args.repeat,
+        'django': django.get_version(),
+        'safedelete': safedelete.__version__,
+        'python': platform.python_version(),
+        'results': results,
+    }
+
+
+def postgresql_available():
+    try:
+        import psycopg2
+    except ImportError:
+        return False
+    try:
+        psycopg2.connect(dbname=os.environ.get('PGDATABASE', 'postgres')).close()
+    except psycopg2.Error:
+        return False
+    return True
+
+
+def run_subprocess(database, args):
+    """Run the benchmarks in a new process, as the settings can only be loaded once."""
+    command = [
+        sys.executable, '-m', 'benchmarks', '--database', database,
+        '--scale', str(args.scale), '--repeat', str(args.repeat),
+    ]
+    if args.case:
+        command += ['--case', args.case]
+    output = subprocess.check_output(command, cwd=ROOT)
+    return json.loads(output.decode('utf-8'))['runs']
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmark the safedelete hot paths.')
+    parser.add_argument('--database', choices=('auto', 'sqlite', 'postgresql'), default='auto',
+                        help='auto runs on SQLite, then PostgreSQL when available (default: auto)')
+    parser.add_argument('--scale', type=int, default=1000, help='number of objects per case (default: 1000)')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per case, the minimum is kept (default: 5)')
+    parser.add_argument('--case', help='only run the cases whose name contains this string')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    if args.database == 'auto':
+        runs = run_subprocess('sqlite', args)
+        if postgresql_available():
+            runs += run_subprocess('postgresql', args)
+        else:
+            print('PostgreSQL is not available, skipped.', file=sys.stderr)
+    else:
+        sys.path.insert(0, ROOT)
+        os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+        os.environ['SAFEDELETE_BENCH_DATABASE'] = args.database
+        runs = [run(args)]
+
+    output = json.dumps({'runs': runs}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+"""The benchmark cases.
+
+Each case creates its data, then measures the code run within ``with timer:``.
+It is run inside a transaction which is rolled back afterwards, and gets the
+``scale`` of the run, i.e. the number of objects to work with.
+"""
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.exceptions import ValidationError
+from django.db.models import QuerySet
+from django.test import RequestFactory
+
+from safedelete.admin import SafeDeleteAdmin
+from safedelete.utils import (can_hard_delete, iter_related_objects,
+                              related_objects, related_pks)
+
+from .models import (BenchAuthor, BenchBook, BenchChapter, BenchHard,
+                     BenchNoCascade, BenchNoCascadeChild, BenchNoDelete,
+                     BenchNode, BenchSoft, BenchUnique)
+
+CASES = []
+
+# Chapters per book in the cascade fan-out cases.
+CHAPTERS_PER_BOOK = 2
+# Maximum length of the chain in the cascade depth case.
+MAX_DEPTH = 200
+
+
+def case(name):
+    """Register a benchmark case."""
+    def decorator(func):
+        CASES.append((name, func))
+        return func
+    return decorator
+
+
+def create(model, count, **kwargs):
+    model.objects.bulk_create([model(**kwargs) for i in range(count)])
+    return list(model.all_objects.order_by('pk'))
+
+
+def create_author(scale):
+    """An author with ``scale`` books of ``CHAPTERS_PER_BOOK`` chapters."""
+    author = BenchAuthor.objects.create()
+    books = create(BenchBook, scale, author=author)
+    BenchChapter.objects.bulk_create([
+        BenchChapter(book=book) for book in books for i in range(CHAPTERS_PER_BOOK)
+    ])
+    return author
+
+
+@case('model.delete/HARD_DELETE')
+def model_delete_hard(timer, scale):
+    objs = create(BenchHard, scale)
+    with timer:
+        for obj in objs:
+            obj.delete()
+
+
+@case('model.delete/SOFT_DELETE')
+def model_delete_soft(timer, scale):
+    objs = create(BenchSoft, scale)
+    with timer:
+        for obj in objs:
+            obj.delete()
+
+
+@case('model.delete/NO_DELETE')
+def model_delete_no_delete(timer, scale):
+    objs = create(BenchNoDelete, scale)
+    with timer:
+        for obj in objs:
+            obj.delete()
+
+
+@case('model.delete/HARD_DELETE_NOCASCADE')
+def model_delete_hard_nocascade(timer, scale):
+    objs = create(BenchNoCascade, scale)
+    # Half of the objects have a dependent and are only soft deleted.
+    BenchNoCascadeChild.objects.bulk_create([BenchNoCascadeChild(parent=obj) for obj in objs[::2]])
+    with timer:
+        for obj in objs:
+            obj.delete()
+
+
+@case('model.delete/SOFT_DELETE_CASCADE fan-out')
+def model_delete_cascade_fanout(timer, scale):
+    author = create_author(scale)
+    with timer:
+        author.delete()
+
+
+@case('model.undelete/SOFT_DELETE_CASCADE fan-out')
+def model_undelete_cascade_fanout(timer, scale):
+    author = create_author(scale)
+    author.delete()
+    with timer:
+        author.undelete()
+
+
+@case('model.delete/SOFT_DELETE_CASCADE depth')
+def model_delete_cascade_depth(timer, scale):
+    root = parent = BenchNode.objects.create()
+    for i in range(min(scale, MAX_DEPTH)):
+        parent = BenchNode.objects.create(parent=parent)
+    with timer:
+        root.delete()
+
+
+@case('queryset.delete/SOFT_DELETE')
+def queryset_delete_soft(timer, scale):
+    create(BenchSoft, scale)
+    with timer:
+        BenchSoft.objects.all().delete()
+
+
+@case('queryset.delete/SOFT_DELETE without signals')
+def queryset_delete_soft_no_signals(timer, scale):
+    create(BenchSoft, scale)
+    with timer:
+        BenchSoft.objects.all().delete(send_signals=False)
+
+
+@case('queryset.delete/HARD_DELETE_NOCASCADE')
+def queryset_delete_hard_nocascade(timer, scale):
+    objs = create(BenchNoCascade, scale)
+    BenchNoCascadeChild.objects.bulk_create([BenchNoCascadeChild(parent=obj) for obj in objs[::2]])
+    with timer:
+        BenchNoCascade.objects.all().delete()
+
+
+@case('queryset.delete/SOFT_DELETE_CASCADE')
+def queryset_delete_cascade(timer, scale):
+    for i in range(10):
+        create_author(scale // 10)
+    with timer:
+        BenchAuthor.objects.all().delete()
+
+
+@case('queryset.undelete/SOFT_DELETE')
+def queryset_undelete_soft(timer, scale):
+    create(BenchSoft, scale, deleted='2000-01-01 00:00')
+    with timer:
+        BenchSoft.deleted_objects.all().undelete()
+
+
+@case('queryset.undelete/SOFT_DELETE without signals')
+def queryset_undelete_soft_no_signals(timer, scale):
+    create(BenchSoft, scale, deleted='2000-01-01 00:00')
+    with timer:
+        BenchSoft.deleted_objects.all().undelete(send_signals=False)
+
+
+@case('related_objects')
+def bench_related_objects(timer, scale):
+    author = create_author(scale)
+    with timer:
+        list(related_objects(author))
+
+
+@case('related_pks')
+def bench_related_pks(timer, scale):
+    author = create_author(scale)
+    with timer:
+        list(related_pks(author))
+
+
+@case('iter_related_objects')
+def bench_iter_related_objects(timer, scale):
+    author = create_author(scale)
+    with timer:
+        list(iter_related_objects(author))
+
+
+@case('can_hard_delete')
+def bench_can_hard_delete(timer, scale):
+    objs = create(BenchNoCascade, scale)
+    BenchNoCascadeChild.objects.bulk_create([BenchNoCascadeChild(parent=obj) for obj in objs[::2]])
+    with timer:
+        for obj in objs:
+            can_hard_delete(obj)
+
+
+@case('visibility/iterate')
+def visibility_iterate(timer, scale):
+    create(BenchSoft, scale // 2)
+    create(BenchSoft, scale // 2, deleted='2000-01-01 00:00')
+    with timer:
+        for i in range(10):
+            list(BenchSoft.objects.all())
+
+
+@case('visibility/count')
+def visibility_count(timer, scale):
+    create(BenchSoft, scale // 2)
+    create(BenchSoft, scale // 2, deleted='2000-01-01 00:00')
+    with timer:
+        for i in range(scale):
+            BenchSoft.objects.filter(name='').count()
+
+
+@case('queryset/attribute access')
+def queryset_attribute_access(timer, scale):
+    # Django reads these attributes on every ORM call.
+    qs = BenchSoft.objects.all()
+    with timer:
+        for i in range(scale * 100):
+            qs.query
+            qs.model
+            qs._db
+            qs._result_cache
+
+
+@case('queryset/attribute access (Django QuerySet)')
+def django_queryset_attribute_access(timer, scale):
+    qs = QuerySet(BenchSoft)
+    with timer:
+        for i in range(scale * 100):
+            qs.query
+            qs.model
+            qs._db
+            qs._result_cache
+
+
+@case('queryset/clone chain')
+def queryset_clone_chain(timer, scale):
+    qs = BenchSoft.objects.all()
+    with timer:
+        for i in range(scale):
+            qs.filter(name='bench').exclude(pk=1).order_by('pk')
+
+
+@case('queryset/clone chain (Django QuerySet)')
+def django_queryset_clone_chain(timer, scale):
+    qs = QuerySet(BenchSoft)
+    with timer:
+        for i in range(scale):
+            qs.filter(name='bench').exclude(pk=1).order_by('pk')
+
+
+@case('manager.update_or_create')
+def manager_update_or_create(timer, scale):
+    objs = [
+        BenchUnique(code='code%d' % i, slug='slug%d' % i, first_name='first%d' % i, last_name='last')
+        for i in range(scale)
+    ]
+    BenchUnique.objects.bulk_create(objs)
+    # Half of the rows are revived.
+    BenchUnique.objects.filter(pk__in=BenchUnique.objects.values('pk')[:scale // 2]).delete()
+    with timer:
+        for i in range(scale):
+            BenchUnique.objects.update_or_create(code='code%d' % i, defaults={'last_name': 'updated'})
+
+
+@case('model.validate_unique')
+def model_unique_checks(timer, scale):
+    BenchUnique.objects.bulk_create([
+        BenchUnique(code='code%d' % i, slug='slug%d' % i, first_name='first%d' % i, last_name='last')
+        for i in range(0, scale, 2)
+    ])
+    BenchUnique.objects.all().delete()
+    objs = [
+        BenchUnique(code='code%d' % i, slug='slug%d' % i, first_name='first%d' % i, last_name='last')
+        for i in range(scale)
+    ]
+    with timer:
+        for obj in objs:
+            try:
+                obj.validate_unique()
+            except ValidationError:
+                # Half of the objects conflict with soft deleted rows.
+                pass
+
+
+@case('admin.undelete_selected')
+def admin_undelete_selected(timer, scale):
+    create(BenchSoft, scale, deleted='2000-01-01 00:00')
+    user = User.objects.create_superuser('bench', 'bench@example.com', 'bench')
+    request = RequestFactory().post('/', {'post': 'yes'})
+    request.user = user
+    request._messages = CookieStorage(request)
+    modeladmin = SafeDeleteAdmin(BenchSoft, AdminSite())
+    with timer:
+        modeladmin.undelete_selected(request, BenchSoft.all_objects.all())
@@ -0,0 +1,56 @@
+from django.db import models
+
+from safedelete.config import (HARD_DELETE, HARD_DELETE_NOCASCADE, NO_DELETE,
+                               SOFT_DELETE, SOFT_DELETE_CASCADE)
+from safedelete.models import SafeDeleteModel
+
+
+class BenchHard(SafeDeleteModel):
+    _safedelete_policy = HARD_DELETE
+
+
+class BenchSoft(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE
+
+    name = models.CharField(max_length=100, blank=True)
+    payload = models.TextField(blank=True)
+
+
+class BenchNoDelete(SafeDeleteModel):
+    _safedelete_policy = NO_DELETE
+
+
+class BenchNoCascade(SafeDeleteModel):
+    _safedelete_policy = HARD_DELETE_NOCASCADE
+
+
+class BenchNoCascadeChild(models.Model):
+    parent = models.ForeignKey(BenchNoCascade, on_delete=models.CASCADE)
+
+
+class BenchAuthor(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+
+class BenchBook(SafeDeleteModel):
+    author = models.ForeignKey(BenchAuthor, on_delete=models.CASCADE)
+
+
+class BenchChapter(SafeDeleteModel):
+    book = models.ForeignKey(BenchBook, on_delete=models.CASCADE)
+
+
+class BenchNode(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True)
+
+
+class BenchUnique(SafeDeleteModel):
+    code = models.CharField(max_length=100, unique=True)
+    slug = models.CharField(max_length=100, unique=True)
+    first_name = models.CharField(max_length=100)
+    last_name = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = (('first_name', 'last_name'),)
@@ -0,0 +1,26 @@
+import os
+
+from safedelete.tests.settings import *  # noqa: F401,F403
+from safedelete.tests.settings import INSTALLED_APPS
+
+DEBUG = False
+
+INSTALLED_APPS = INSTALLED_APPS + ('benchmarks',)
+
+if os.environ.get('SAFEDELETE_BENCH_DATABASE') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('PGDATABASE', 'postgres'),
+            'USER': os.environ.get('PGUSER', ''),
+            'PASSWORD': os.environ.get('PGPASSWORD', ''),
+            'HOST': os.environ.get('PGHOST', ''),
+            'PORT': os.environ.get('PGPORT', ''),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+        }
+    }
@@ -1,7 +1,6 @@
 from __future__ import unicode_literals
 
 import django
-from distutils.version import LooseVersion
 from django.contrib import admin, messages
 from django.contrib.admin import helpers
 from django.contrib.admin.models import CHANGE, LogEntry
@@ -14,7 +13,11 @@ from django.utils.html import conditional_escape, format_html
 from django.utils.six import text_type
 from django.utils.translation import ugettext_lazy as _
 
-from .utils import related_objects
+from .utils import iter_related_objects
+
+# Version dependent behaviours, resolved once.
+MESSAGE_USER_HAS_LEVEL = django.VERSION >= (1, 5)
+TEMPLATE_RESPONSE_HAS_CURRENT_APP = django.VERSION < (1, 10)
 
 
 def highlight_deleted(obj):
@@ -102,7 +105,7 @@ class SafeDeleteAdmin(admin.ModelAdmin):
                     obj_display = force_text(obj)
                     self.log_undeletion(request, obj, obj_display)
                 queryset.undelete()
-                if django.VERSION[1] <= 4:
+                if not MESSAGE_USER_HAS_LEVEL:
                     self.message_user(
                         request,
                         _("Successfully undeleted %(count)d %(items)s.") % {
@@ -127,7 +130,7 @@ class SafeDeleteAdmin(admin.ModelAdmin):
             objects_name = force_text(opts.verbose_name_plural)
         title = _("Are you sure?")
 
-        related_list = [list(related_objects(obj)) for obj in queryset]
+        related_list = [list(iter_related_objects(obj)) for obj in queryset]
 
         context = {
             'title': title,
@@ -139,7 +142,7 @@ class SafeDeleteAdmin(admin.ModelAdmin):
             'related_list': related_list
         }
 
-        if LooseVersion(django.get_version()) < LooseVersion('1.10'):
+        if TEMPLATE_RESPONSE_HAS_CURRENT_APP:
             return TemplateResponse(
                 request,
                 self.undelete_selected_confirmation_template,
@@ -0,0 +1,97 @@
+"""Asynchronous execution of the safedelete operations, on Python 3.5+.
+
+The ``adelete``, ``aundelete`` and ``aupdate_or_create`` coroutines run their
+synchronous counterpart in a pool of ``SAFE_DELETE_ASYNC_WORKERS`` threads, so
+the event loop is not blocked by the queries::
+
+    count, per_model = await Article.objects.filter(author=author).adelete()
+
+The operations are run as a whole in a single thread: the bulk updates, the
+batch signals and the ``SOFT_DELETE_CASCADE`` cascades are processed by chunks
+of ``SAFE_DELETE_BATCH_SIZE`` like the synchronous ones. The thread uses its
+own database connection, so a ``transaction.atomic()`` block of the caller
+does not include the operation, which is committed on its own.
+
+This module uses the ``async``/``await`` syntax, it is only imported when
+``safedelete.utils.HAS_ASYNCIO`` is true.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_lock = threading.Lock()
+
+# asyncio.get_running_loop() is new in Python 3.7, get_event_loop() returns
+# the running loop as well when called from a coroutine.
+_get_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+
+def get_executor():
+    """Return the thread pool running the asynchronous operations, created on first use.
+
+    Its size is set by ``SAFE_DELETE_ASYNC_WORKERS`` (defaults to ``1``, so the
+    operations are run one at a time, in the order they were awaited).
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'SAFE_DELETE_ASYNC_WORKERS', 1))
+        return _executor
+
+
+async def run_in_thread(func, *args, **kwargs):
+    """Return the result of ``func(*args, **kwargs)``, run by :func:`get_executor`.
+
+    Nothing is run until the coroutine is awaited. The database connections
+    of the thread are recycled before and after the call like between two
+    requests, according to ``CONN_MAX_AGE``.
+    """
+    return await _get_running_loop().run_in_executor(
+        get_executor(), functools.partial(_call, func, args, kwargs),
+    )
+
+
+def _call(func, args, kwargs):
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def model_adelete(self, force_policy=None, **kwargs):
+    """Asynchronous :func:`delete`, see :mod:`safedelete.aio`.
+
+    With ``SOFT_DELETE_CASCADE``, the whole cascade is run in the thread.
+    """
+    return await run_in_thread(self.delete, force_policy=force_policy, **kwargs)
+
+
+async def model_aundelete(self, force_policy=None, **kwargs):
+    """Asynchronous :func:`undelete`, see :mod:`safedelete.aio`."""
+    return await run_in_thread(self.undelete, force_policy=force_policy, **kwargs)
+
+
+async def queryset_adelete(self, force_policy=None, send_signals=True):
+    """Asynchronous :func:`delete`, see :mod:`safedelete.aio`.
+
+    The chunks and their batch signals are processed in the thread.
+    """
+    return await run_in_thread(self.delete, force_policy=force_policy, send_signals=send_signals)
+queryset_adelete.alters_data = True
+
+
+async def queryset_aundelete(self, force_policy=None, send_signals=True):
+    """Asynchronous :func:`undelete`, see :mod:`safedelete.aio`."""
+    return await run_in_thread(self.undelete, force_policy=force_policy, send_signals=send_signals)
+queryset_aundelete.alters_data = True
+
+
+async def manager_aupdate_or_create(self, defaults=None, **kwargs):
+    """Asynchronous :func:`update_or_create`, returns ``(obj, created)``, see :mod:`safedelete.aio`."""
+    return await run_in_thread(self.update_or_create, defaults, **kwargs)
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import class_prepared
 
 
 class SafeDeleteConfig(AppConfig):
@@ -7,4 +8,9 @@ class SafeDeleteConfig(AppConfig):
     verbose_name = 'Safe Delete'
 
     def ready(self):
-        pass
+        from .models import class_prepared_receiver, register_safedelete_meta
+
+        for model in self.apps.get_models(include_auto_created=True):
+            register_safedelete_meta(model)
+        # Models defined later on (e.g. in tests) are registered when prepared.
+        class_prepared.connect(class_prepared_receiver, dispatch_uid='safedelete_meta')
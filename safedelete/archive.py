@@ -0,0 +1,207 @@
+"""Archival of the old soft deleted objects.
+
+The soft deleted rows of a model can be moved to an archive table, declared
+next to the model with :func:`archive_model` so that migrations create it::
+
+    class Article(SafeDeleteModel):
+        title = models.CharField(max_length=100)
+
+    ArticleArchive = archive_model(Article)
+
+Then :func:`archive_deleted` moves the rows deleted for longer than
+``SAFE_DELETE_ARCHIVE_AGE`` by batches, and ``Article.deleted_objects.archived()``
+reads them back.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models, router, transaction
+from django.db.models.deletion import CASCADE, get_candidate_relations_to_delete
+from django.utils import timezone
+
+from .utils import chunks, dependents_filter, get_batch_size
+
+DEFAULT_ARCHIVE_AGE = timedelta(days=90)
+
+# Archive model of each model, filled by archive_model().
+_archive_models = {}
+
+# Primary key types of the archive models, which must not generate values.
+ARCHIVE_PK_FIELDS = {
+    'AutoField': models.IntegerField,
+    'BigAutoField': models.BigIntegerField,
+}
+
+
+def archive_model(model, name=None, db_table=None):
+    """Create the archive model of a safedelete ``model``.
+
+    The archive model has the concrete fields of ``model``, without their
+    unique constraints nor foreign key constraints, plus an ``archived``
+    datetime. It has to be assigned in a ``models`` module so that migrations
+    pick it up.
+
+    Args:
+        model: Safedelete model class, multi-table inheritance is not supported.
+        name: Name of the archive model. (default: {'<model name>Archive'})
+        db_table: Name of its table. (default: {'<model table>_archive'})
+    """
+    if model._meta.parents:
+        raise ImproperlyConfigured('Cannot archive %s: multi-table inheritance is not supported.' % model._meta.label)
+
+    attrs = {
+        '__module__': model.__module__,
+        'Meta': type('Meta', (object,), {
+            'app_label': model._meta.app_label,
+            'db_table': db_table or '%s_archive' % model._meta.db_table,
+        }),
+        'archived': models.DateTimeField(db_index=True),
+        'source_model': model,
+        'to_instance': _to_instance,
+    }
+    for field in model._meta.concrete_fields:
+        attrs[field.name] = _archive_field(field)
+
+    archive = type(str(name or '%sArchive' % model.__name__), (models.Model,), attrs)
+    _archive_models[model] = archive
+    return archive
+
+
+def _archive_field(field):
+    """Return the field of the archive model storing the values of ``field``."""
+    if field.primary_key and field.get_internal_type() in ARCHIVE_PK_FIELDS:
+        return ARCHIVE_PK_FIELDS[field.get_internal_type()](primary_key=True, db_column=field.column)
+    if field.is_relation:
+        return models.ForeignKey(
+            field.remote_field.model, on_delete=models.DO_NOTHING, db_constraint=False,
+            to_field=field.remote_field.field_name, related_name='+', null=field.null,
+            db_column=field.column,
+        )
+    name, path, args, kwargs = field.deconstruct()
+    # The values are copied as they are, without constraints.
+    for key in ('unique', 'db_index', 'auto_now', 'auto_now_add'):
+        kwargs.pop(key, None)
+    return field.__class__(*args, **kwargs)
+
+
+def _to_instance(self):
+    """Return an unsaved instance of the source model with the values of this archived object."""
+    return self.source_model(**{
+        field.attname: getattr(self, field.attname) for field in self.source_model._meta.concrete_fields
+    })
+
+
+def get_archive_model(model):
+    """Return the archive model of ``model`` declared with :func:`archive_model`, or ``None``."""
+    return _archive_models.get(model)
+
+
+def get_archive_models():
+    """Return a dictionary of the archive model of each archived model."""
+    return dict(_archive_models)
+
+
+def get_archive_age():
+    """Return the age of the soft deleted objects to archive.
+
+    Configurable through the ``SAFE_DELETE_ARCHIVE_AGE`` setting, a :class:`datetime.timedelta`.
+    """
+    return getattr(settings, 'SAFE_DELETE_ARCHIVE_AGE', DEFAULT_ARCHIVE_AGE)
+
+
+def archive_deleted(model, older_than=None, batch_size=None, using=None):
+    """Move the objects of ``model`` soft deleted for longer than ``older_than`` to its archive table.
+
+    The rows are moved by batches of ``batch_size``, each in its own
+    transaction. The objects which would delete other objects in cascade are
+    left in place until those are deleted or archived, so archive the related
+    models first. The ``pre_delete`` and ``post_delete`` signals are only sent
+    when other relations have to be updated by Django's deletion.
+
+    The links of the auto-created many-to-many through tables are deleted
+    with the archived objects, they are not archived.
+
+    Args:
+        model: Model class with an archive model.
+        older_than: Minimum age of the deletion. (default: {SAFE_DELETE_ARCHIVE_AGE})
+        batch_size: Number of objects per transaction. (default: {SAFE_DELETE_BATCH_SIZE})
+        using: Database alias. (default: {None})
+
+    Returns the number of archived objects.
+    """
+    archive = _get_archive_model(model)
+    batch_size = batch_size or get_batch_size()
+    using = using or router.db_for_write(model)
+    now = timezone.now()
+    cutoff = now - (get_archive_age() if older_than is None else older_than)
+    attnames = [field.attname for field in model._meta.concrete_fields]
+
+    queryset = model._base_manager.using(using).filter(deleted__lt=cutoff)
+    dependents = dependents_filter(model, using, skip_auto_created=True)
+    if dependents is None:
+        raise ImproperlyConfigured(
+            'Cannot archive %s: the object ids of its generic relations cannot be compared '
+            'to its primary key.' % model._meta.label
+        )
+    queryset = queryset.exclude(dependents)
+    relations = list(get_candidate_relations_to_delete(model._meta))
+    through_relations = [related for related in relations if related.related_model._meta.auto_created]
+    # The objects left have no related objects deleted in cascade but their
+    # many-to-many links, so unless other relations need to be updated, their
+    # rows are simply deleted.
+    raw_delete = all(
+        related.field.remote_field.on_delete in (CASCADE, models.DO_NOTHING)
+        for related in relations
+    )
+
+    count = 0
+    while True:
+        with transaction.atomic(using=using):
+            rows = list(queryset.order_by('pk').values(*attnames)[:batch_size])
+            if not rows:
+                break
+            archive._base_manager.using(using).bulk_create([archive(archived=now, **row) for row in rows])
+            pks = [row[model._meta.pk.attname] for row in rows]
+            archived_qs = queryset.filter(pk__in=pks)
+            if raw_delete:
+                for related in through_relations:
+                    related.related_model._base_manager.using(using).filter(
+                        **{'%s__in' % related.field.name: pks}
+                    )._raw_delete(using)
+                archived_qs._raw_delete(using)
+            else:
+                archived_qs.delete()
+        count += len(rows)
+        if len(rows) < batch_size:
+            break
+    return count
+
+
+def restore_archived(queryset, batch_size=None):
+    """Move back the archived objects of ``queryset`` to the table of their model, still soft deleted.
+
+    Args:
+        queryset: QuerySet of an archive model.
+        batch_size: Number of objects per query. (default: {SAFE_DELETE_BATCH_SIZE})
+
+    Returns the number of restored objects.
+    """
+    archive = queryset.model
+    model = archive.source_model
+    using = queryset.db
+    count = 0
+    with transaction.atomic(using=using):
+        objs = list(queryset)
+        for chunk in chunks(objs, batch_size or get_batch_size()):
+            model._base_manager.using(using).bulk_create([obj.to_instance() for obj in chunk])
+            archive._base_manager.using(using).filter(pk__in=[obj.pk for obj in chunk]).delete()
+            count += len(chunk)
+    return count
+
+
+def _get_archive_model(model):
+    archive = get_archive_model(model)
+    if archive is None:
+        raise ImproperlyConfigured('%s has no archive model, see safedelete.archive.archive_model().' % model._meta.label)
+    return archive
@@ -0,0 +1,214 @@
+"""Background execution of the ``SOFT_DELETE_CASCADE`` cascades.
+
+When ``SAFE_DELETE_CASCADE_EXECUTOR`` is set, deleting an object with the
+``SOFT_DELETE_CASCADE`` policy only soft deletes the object itself, and hands
+the cascade to the executor as a :class:`CascadeTask`. The related objects are
+then soft deleted in the background, by batches of ``SAFE_DELETE_BATCH_SIZE``,
+with the deletion datetime of the object.
+
+Two executors are available:
+
+- :class:`ThreadPoolCascadeExecutor` runs the cascades in threads of the
+  current process, once the transaction deleting the object is committed.
+- :class:`DatabaseCascadeExecutor` stores them in a queue table, within the
+  transaction deleting the object, and the ``safedelete_cascade`` management
+  command runs them.
+"""
+import logging
+import threading
+import traceback
+from collections import Counter, namedtuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, models, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.utils.six.moves import queue
+
+logger = logging.getLogger('safedelete.cascade')
+
+_executors = {}
+
+CascadeTask = namedtuple('CascadeTask', ['model', 'pk', 'deleted', 'using'])
+CascadeTask.__doc__ = """Cascade of the object ``pk`` of ``model`` (a model label), deleted at ``deleted``."""
+
+
+def get_cascade_executor():
+    """Return the executor configured by ``SAFE_DELETE_CASCADE_EXECUTOR``, or ``None``.
+
+    The setting is the dotted path of a :class:`BaseCascadeExecutor` subclass,
+    e.g. ``'safedelete.cascade.ThreadPoolCascadeExecutor'``.
+    """
+    path = getattr(settings, 'SAFE_DELETE_CASCADE_EXECUTOR', None)
+    if not path:
+        return None
+    try:
+        return _executors[path]
+    except KeyError:
+        executor = _executors[path] = import_string(path)()
+        return executor
+
+
+def run_cascade(task, progress=None):
+    """Soft delete the objects related to the object of ``task``.
+
+    It can be run again after a failure: the objects already soft deleted are
+    skipped. Nothing is done if the object was undeleted, deleted again or
+    removed since.
+
+    Args:
+        task: :class:`CascadeTask` to run.
+        progress: Function called with the model and the number of objects
+            after each batch. (default: {None})
+
+    Returns a :class:`collections.Counter` of the soft deleted objects per model label.
+    """
+    # safedelete.models imports this module.
+    from .models import soft_delete_related
+
+    model = apps.get_model(task.model)
+    obj = model._base_manager.using(task.using).filter(pk=task.pk).first()
+    if obj is None or obj.deleted != task.deleted:
+        return Counter()
+    return soft_delete_related(obj, task.deleted, task.using, progress=progress)
+
+
+class BaseCascadeExecutor(object):
+    """Interface of the cascade executors."""
+
+    def submit(self, task):
+        """Schedule a :class:`CascadeTask`, called within the transaction deleting its object."""
+        raise NotImplementedError('subclasses of BaseCascadeExecutor must provide a submit() method')
+
+
+class ThreadPoolCascadeExecutor(BaseCascadeExecutor):
+    """Run the cascades in background threads, once the deletion is committed.
+
+    :attribute workers: Number of threads, ``SAFE_DELETE_CASCADE_WORKERS`` (defaults to ``2``).
+    :attribute progress: Number of objects soft deleted so far per task, removed when it is done.
+
+    .. note::
+        The tasks are lost if the process stops, and the failed ones are only
+        logged on the ``safedelete.cascade`` logger.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or getattr(settings, 'SAFE_DELETE_CASCADE_WORKERS', 2)
+        self.progress = {}
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, task):
+        transaction.on_commit(lambda: self._put(task), using=task.using)
+
+    def _put(self, task):
+        with self._lock:
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._work, name='safedelete-cascade-%d' % i)
+                    thread.daemon = True
+                    thread.start()
+                    self._threads.append(thread)
+        self.progress[task] = 0
+        self._queue.put(task)
+
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            try:
+                run_cascade(task, progress=lambda model, count: self._advance(task, count))
+            except Exception:
+                logger.exception('Cascade of %s %s failed', task.model, task.pk)
+            finally:
+                self.progress.pop(task, None)
+                connections[task.using].close()
+                self._queue.task_done()
+
+    def _advance(self, task, count):
+        self.progress[task] += count
+
+    def join(self):
+        """Wait until all the submitted tasks are done."""
+        self._queue.join()
+
+
+class AbstractCascadeTask(models.Model):
+    """Queue table of :class:`DatabaseCascadeExecutor`.
+
+    Subclass it in one of your applications and set ``SAFE_DELETE_CASCADE_QUEUE_MODEL``
+    to its label (``'app_label.ModelName'``).
+    """
+    model = models.CharField(max_length=255)
+    object_pk = models.CharField(max_length=255)
+    deleted = models.DateTimeField()
+    using = models.CharField(max_length=100)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True)
+    finished = models.DateTimeField(null=True, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        abstract = True
+
+    def to_task(self):
+        model = apps.get_model(self.model)
+        return CascadeTask(self.model, model._meta.pk.to_python(self.object_pk), self.deleted, self.using)
+
+
+class DatabaseCascadeExecutor(BaseCascadeExecutor):
+    """Store the cascades in the ``SAFE_DELETE_CASCADE_QUEUE_MODEL`` table.
+
+    The tasks are created in the transaction deleting their object, and are
+    run by :func:`run_pending`, e.g. with the ``safedelete_cascade`` management
+    command. Their progress is saved after each batch, and the failed ones are
+    retried on the next runs.
+
+    .. note::
+        Run a single worker at a time, the tasks are not locked.
+    """
+
+    def get_queue_model(self):
+        label = getattr(settings, 'SAFE_DELETE_CASCADE_QUEUE_MODEL', None)
+        if not label:
+            raise ImproperlyConfigured('DatabaseCascadeExecutor requires the SAFE_DELETE_CASCADE_QUEUE_MODEL setting.')
+        return apps.get_model(label)
+
+    def submit(self, task):
+        self.get_queue_model()._default_manager.using(task.using).create(
+            model=task.model, object_pk=str(task.pk), deleted=task.deleted, using=task.using,
+        )
+
+    def run_pending(self, limit=None, using=None):
+        """Run the tasks which are not finished yet, oldest first.
+
+        Args:
+            limit: Maximum number of tasks to run. (default: {None})
+            using: Database alias of the queue table. (default: {None})
+
+        Returns the number of tasks run successfully.
+        """
+        manager = self.get_queue_model()._default_manager.db_manager(using)
+        pending = manager.filter(finished__isnull=True).order_by('pk')
+        if limit is not None:
+            pending = pending[:limit]
+
+        done = 0
+        for row in pending:
+            manager.filter(pk=row.pk).update(attempts=F('attempts') + 1, started=timezone.now())
+            try:
+                run_cascade(row.to_task(), progress=lambda model, count, pk=row.pk: manager.filter(
+                    pk=pk
+                ).update(processed=F('processed') + count))
+            except Exception:
+                logger.exception('Cascade of %s %s failed', row.model, row.object_pk)
+                manager.filter(pk=row.pk).update(error=traceback.format_exc())
+            else:
+                manager.filter(pk=row.pk).update(finished=timezone.now(), error='')
+                done += 1
+        return done
@@ -0,0 +1,69 @@
+"""Delivery of the signals sent after soft deleting or undeleting objects.
+
+With the ``SAFE_DELETE_DEFER_SIGNALS`` setting, the ``post_softdelete``,
+``post_undelete`` and their ``_batch`` signals sent within a transaction are
+queued and delivered once it is committed, so their receivers do not hold the
+transaction and its locks. They are dropped if it is rolled back.
+"""
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connections
+
+
+def defer_signals():
+    """Return whether the post signals are delivered on commit, see ``SAFE_DELETE_DEFER_SIGNALS``."""
+    return getattr(settings, 'SAFE_DELETE_DEFER_SIGNALS', False)
+
+
+def send_post_signal(signal, sender, using, **kwargs):
+    """Send a post signal now, or when the current transaction of ``using`` is committed.
+
+    The deferred signals are grouped per model, and the batch signals of a
+    model sharing the same deletion datetime are coalesced into a single one
+    with all the primary keys.
+    """
+    connection = connections[using]
+    if not defer_signals() or not connection.in_atomic_block:
+        signal.send(sender=sender, using=using, **kwargs)
+        return
+    _get_queue(connection).add(signal, sender, using, kwargs)
+
+
+def _get_queue(connection):
+    """Return the queue registered with ``on_commit()`` for the current savepoint, registering one if needed.
+
+    The queues registered while a savepoint was active are discarded by Django
+    if it is rolled back, with their signals.
+    """
+    sids = set(connection.savepoint_ids)
+    for entry in reversed(connection.run_on_commit):
+        if isinstance(entry[1], DeferredSignals) and entry[0] == sids:
+            return entry[1]
+    queue = DeferredSignals()
+    connection.on_commit(queue)
+    return queue
+
+
+class DeferredSignals(object):
+    """Signals to deliver on commit, called by ``on_commit()``."""
+
+    def __init__(self):
+        self.pending = OrderedDict()
+
+    def add(self, signal, sender, using, kwargs):
+        if 'pks' in kwargs:
+            key = (signal, sender, using, kwargs.get('deleted'))
+            if key in self.pending:
+                self.pending[key][0]['pks'].extend(kwargs['pks'])
+                return
+            kwargs = dict(kwargs, pks=list(kwargs['pks']))
+            self.pending[key] = [kwargs]
+        else:
+            self.pending.setdefault((signal, sender, using, None), []).append(kwargs)
+
+    def __call__(self):
+        pending, self.pending = self.pending, OrderedDict()
+        for (signal, sender, using, deleted), payloads in pending.items():
+            for kwargs in payloads:
+                signal.send(sender=sender, using=using, **kwargs)
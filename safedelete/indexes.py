@@ -0,0 +1,61 @@
+import django
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.db.models import Q
+
+# Partial indexes (``Index.condition``) are available since Django 2.2.
+SUPPORTS_PARTIAL_INDEXES = django.VERSION >= (2, 2)
+
+
+def visible_index(fields, name):
+    """Return a partial index on ``fields`` restricted to the objects which are not deleted.
+
+    The default managers filter on ``deleted IS NULL``, which this index
+    condition matches, so the queries only scan the visible rows even when
+    most of the table is soft deleted.
+
+    >>> class Article(SafeDeleteModel):
+    ...     author = models.ForeignKey(Author, on_delete=models.CASCADE)
+    ...     created = models.DateTimeField()
+    ...
+    ...     class Meta:
+    ...         indexes = [visible_index(['author', '-created'], 'article_visible_author_idx')]
+
+    Args:
+        fields: Field names of the index, like :class:`django.db.models.Index`.
+        name: Name of the index, which is required with a condition.
+
+    .. note::
+        Partial indexes are created on PostgreSQL and SQLite. Other databases
+        create a full index instead.
+    """
+    if not SUPPORTS_PARTIAL_INDEXES:
+        raise ImproperlyConfigured('visible_index() requires Django 2.2 or later.')
+    return models.Index(fields=list(fields), name=name, condition=Q(deleted__isnull=True))
+
+
+def is_visible_index(index):
+    """Return whether ``index`` is restricted to the objects which are not deleted."""
+    condition = getattr(index, 'condition', None)
+    return condition is not None and condition == Q(deleted__isnull=True)
+
+
+def check_visible_indexes(model, connection):
+    """Return the problems found with the visible indexes of a safedelete ``model``, as strings.
+
+    Either no :func:`visible_index` is declared on the model, or the declared
+    ones are missing from the database.
+    """
+    declared = [index for index in model._meta.indexes if is_visible_index(index)]
+    if not declared:
+        return ['no visible_index() declared, the queries filtering on "deleted IS NULL" scan all the rows']
+
+    problems = []
+    if not getattr(connection.features, 'supports_partial_indexes', False):
+        problems.append('%s does not support partial indexes, full indexes are used' % connection.vendor)
+    with connection.cursor() as cursor:
+        existing = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    for index in declared:
+        if index.name not in existing:
+            problems.append('index %s is missing from the database, run migrate' % index.name)
+    return problems
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from ...archive import archive_deleted, get_archive_models
+
+
+class Command(BaseCommand):
+    help = (
+        'Move the old soft deleted objects to the archive tables '
+        '(see safedelete.archive.archive_model).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'model', nargs='*',
+            help='Only archive these models, as app_label.ModelName.',
+        )
+        parser.add_argument(
+            '--days', type=int,
+            help='Archive the objects deleted for more days than this. Defaults to SAFE_DELETE_ARCHIVE_AGE.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            help='Number of objects archived per transaction. Defaults to SAFE_DELETE_BATCH_SIZE.',
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database to archive. Defaults to the "default" database.',
+        )
+
+    def handle(self, *args, **options):
+        archived_models = {model._meta.label_lower: model for model in get_archive_models()}
+        labels = [label.lower() for label in options['model']] or sorted(archived_models)
+        for label in labels:
+            if label not in archived_models:
+                raise CommandError('%s has no archive model.' % label)
+
+        older_than = timedelta(days=options['days']) if options['days'] is not None else None
+        for label in labels:
+            count = archive_deleted(
+                archived_models[label], older_than=older_than,
+                batch_size=options['batch_size'], using=options['database'],
+            )
+            self.stdout.write('%s: %d object(s) archived.' % (archived_models[label]._meta.label, count))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from ...cascade import DatabaseCascadeExecutor, get_cascade_executor
+
+
+class Command(BaseCommand):
+    help = 'Run the pending cascades queued by safedelete.cascade.DatabaseCascadeExecutor.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int,
+            help='Maximum number of cascades to run.',
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database of the queue table. Defaults to the "default" database.',
+        )
+
+    def handle(self, *args, **options):
+        executor = get_cascade_executor()
+        if not isinstance(executor, DatabaseCascadeExecutor):
+            raise CommandError('SAFE_DELETE_CASCADE_EXECUTOR is not a DatabaseCascadeExecutor.')
+        done = executor.run_pending(limit=options['limit'], using=options['database'])
+        self.stdout.write('%d cascade(s) run.' % done)
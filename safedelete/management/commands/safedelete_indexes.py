@@ -0,0 +1,46 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, router
+
+from ...indexes import check_visible_indexes
+from ...models import is_safedelete_cls
+
+
+class Command(BaseCommand):
+    help = (
+        'Report the safedelete models without a partial index on the objects which '
+        'are not deleted (see safedelete.indexes.visible_index).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'app_label', nargs='*',
+            help='Only check the models of these applications.',
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database to check. Defaults to the "default" database.',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        app_labels = options['app_label']
+        if app_labels:
+            models = [model for label in app_labels for model in apps.get_app_config(label).get_models()]
+        else:
+            models = apps.get_models()
+
+        missing = 0
+        for model in models:
+            if not is_safedelete_cls(model) or model._meta.proxy or not model._meta.managed:
+                continue
+            if not router.allow_migrate_model(connection.alias, model):
+                continue
+            for problem in check_visible_indexes(model, connection):
+                missing += 1
+                self.stdout.write('%s: %s' % (model._meta.label, problem))
+
+        if missing:
+            self.stdout.write(self.style.WARNING('%d problem(s) found.' % missing))
+        else:
+            self.stdout.write(self.style.SUCCESS('All the safedelete models have their visible indexes.'))
@@ -1,8 +1,24 @@
+from collections import namedtuple
+
+import django
 from django.conf import settings
-from django.db import models
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models, router, transaction
 
+from .archive import get_archive_model
 from .config import DELETED_INVISIBLE, DELETED_ONLY_VISIBLE, DELETED_VISIBLE, SOFT_DELETE, SOFT_DELETE_CASCADE
 from .queryset import SafeDeleteQueryset
+from .signals import post_undelete, post_undelete_batch
+from .utils import HAS_ASYNCIO, bulk_set_deleted, chunks, get_batch_size
+
+if HAS_ASYNCIO:
+    from . import aio
+
+# QuerySet.bulk_update() is available since Django 2.2.
+HAS_BULK_UPDATE = django.VERSION >= (2, 2)
+
+BulkUpdateOrCreateResult = namedtuple('BulkUpdateOrCreateResult', ['created', 'revived', 'updated'])
+BulkUpdateOrCreateResult.__doc__ = """Instances of each outcome of :func:`SafeDeleteManager.bulk_update_or_create`."""
 
 
 class SafeDeleteManager(models.Manager):
@@ -83,6 +99,18 @@ class SafeDeleteManager(models.Manager):
             force_visibility=DELETED_ONLY_VISIBLE
         )
 
+    def archived(self):
+        """Return a QuerySet of the archived objects of this model.
+
+        The objects are instances of the archive model declared with
+        :func:`safedelete.archive.archive_model`, ``to_instance()`` converts
+        them back to this model.
+        """
+        archive = get_archive_model(self.model)
+        if archive is None:
+            raise ImproperlyConfigured('%s has no archive model.' % self.model._meta.label)
+        return archive._default_manager.using(self._db)
+
     def all(self, **kwargs):
         """Pass kwargs to ``SafeDeleteQuerySet.all()``.
 
@@ -140,6 +168,91 @@ class SafeDeleteManager(models.Manager):
 
         return obj, created
 
+    if HAS_ASYNCIO:
+        aupdate_or_create = aio.manager_aupdate_or_create
+
+    def bulk_update_or_create(self, objs, match_fields, update_fields=None, batch_size=None):
+        """Bulk variant of :func:`update_or_create`, matching the objects on ``match_fields``.
+
+        For each chunk of ``batch_size`` objects, the existing rows are found
+        with one query on the ``match_fields`` values, deleted ones included.
+        The soft deleted matches are revived with one ``UPDATE`` query (sending
+        ``post_undelete``), then the ``update_fields`` of all the matches are
+        written with ``bulk_update`` and the other objects are inserted with
+        ``bulk_create``. Everything runs in a transaction.
+
+        Args:
+            objs: Unsaved instances. The matched ones get the primary key of their row.
+            match_fields: Field names identifying the rows, usually unique together.
+            update_fields: Field names written on the matched rows. (default: {None})
+            batch_size: Number of objects per chunk. (default: {SAFE_DELETE_BATCH_SIZE})
+
+        Returns a :class:`BulkUpdateOrCreateResult` with the lists of created,
+        revived and updated (matched but not deleted) instances.
+
+        .. note::
+            Like ``bulk_create``, the ``save`` method of the instances is not called
+            and the pre/post-save signals are not sent. Writing ``update_fields``
+            saves the instances one by one before Django 2.2.
+        """
+        objs = list(objs)
+        batch_size = batch_size or get_batch_size()
+        attnames = [self.model._meta.get_field(field_name).attname for field_name in match_fields]
+        using = self._db or router.db_for_write(self.model)
+
+        keys = [tuple(getattr(obj, attname) for attname in attnames) for obj in objs]
+        if len(set(keys)) != len(keys):
+            raise ValueError('bulk_update_or_create() got several objects with the same %s.' % ', '.join(match_fields))
+
+        # Like update_or_create(), deleted rows are only revived with the soft delete policies.
+        if self.model._safedelete_policy in self.get_soft_delete_policies():
+            queryset = self.all_with_deleted()
+        else:
+            queryset = self.all()
+        queryset = queryset.using(using)
+
+        result = BulkUpdateOrCreateResult([], [], [])
+        with transaction.atomic(using=using):
+            for chunk in chunks(list(zip(keys, objs)), batch_size):
+                lookup = {
+                    '%s__in' % field_name: {key[i] for key, obj in chunk}
+                    for i, field_name in enumerate(match_fields)
+                }
+                existing = {
+                    tuple(row[2:]): row[:2]
+                    for row in queryset.filter(**lookup).values_list('pk', 'deleted', *attnames)
+                }
+                revived, updated, created = [], [], []
+                for key, obj in chunk:
+                    if key not in existing:
+                        created.append(obj)
+                        continue
+                    obj.pk, obj.deleted = existing[key]
+                    obj._state.adding = False
+                    obj._state.db = using
+                    (updated if obj.deleted is None else revived).append(obj)
+
+                if revived:
+                    bulk_set_deleted(
+                        self.model, revived, None, using,
+                        post_signal=post_undelete, post_batch_signal=post_undelete_batch,
+                    )
+                if update_fields and (revived or updated):
+                    self._bulk_update(revived + updated, update_fields, using)
+                if created:
+                    self.model._base_manager.using(using).bulk_create(created)
+                result.created.extend(created)
+                result.revived.extend(revived)
+                result.updated.extend(updated)
+        return result
+
+    def _bulk_update(self, objs, fields, using):
+        if HAS_BULK_UPDATE:
+            self.model._base_manager.using(using).bulk_update(objs, fields)
+        else:
+            for obj in objs:
+                obj.save(keep_deleted=True, update_fields=fields, using=using)
+
     @staticmethod
     def get_soft_delete_policies():
         """Returns all stati which stand for some kind of soft-delete"""
@@ -0,0 +1,230 @@
+"""Instrumentation of the safedelete operations.
+
+The operations (model and queryset deletes and undeletes, related objects
+collection) are measured when a metrics backend is configured with the
+``SAFE_DELETE_METRICS_BACKEND`` setting, or within a :func:`collect_stats`
+block. Otherwise they run untouched.
+"""
+import functools
+import logging
+import threading
+from contextlib import contextmanager
+from timeit import default_timer
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models.query import QuerySet
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('safedelete.metrics')
+
+_local = threading.local()
+_backends = {}
+
+
+class OperationStats(object):
+    """Stats of one safedelete operation.
+
+    :attribute operation: Name of the operation, e.g. ``model.delete``.
+    :attribute model: Model class the operation was run on.
+    :attribute using: Database alias.
+    :attribute queries: Number of queries run on ``using``, nested operations included.
+        Requires Django 2.0+, always ``0`` otherwise.
+    :attribute rows: Number of objects deleted or undeleted.
+    :attribute collected: Number of related objects collected.
+    :attribute elapsed: Time spent in the operation, in seconds.
+    """
+
+    def __init__(self, operation, model, using):
+        self.operation = operation
+        self.model = model
+        self.using = using
+        self.queries = 0
+        self.rows = 0
+        self.collected = 0
+        self.elapsed = 0.0
+
+    def __repr__(self):
+        return '<OperationStats %s %s: %d queries, %d rows, %d collected, %.6fs>' % (
+            self.operation, self.model._meta.label, self.queries,
+            self.rows, self.collected, self.elapsed,
+        )
+
+
+class StatsCollector(object):
+    """Stats of the operations run within a :func:`collect_stats` block.
+
+    :attribute operations: :class:`OperationStats` of each operation, in the order they ended.
+    """
+
+    def __init__(self):
+        self.operations = []
+
+    def record(self, stats):
+        self.operations.append(stats)
+
+    def totals(self):
+        """Return the stats summed per operation name, as dictionaries."""
+        totals = {}
+        for stats in self.operations:
+            total = totals.setdefault(stats.operation, {
+                'count': 0, 'queries': 0, 'rows': 0, 'collected': 0, 'elapsed': 0.0,
+            })
+            total['count'] += 1
+            total['queries'] += stats.queries
+            total['rows'] += stats.rows
+            total['collected'] += stats.collected
+            total['elapsed'] += stats.elapsed
+        return totals
+
+
+class LoggingBackend(object):
+    """Metrics backend logging every operation on the ``safedelete.metrics`` logger."""
+
+    def record(self, stats):
+        logger.info(
+            '%s %s: %d queries, %d rows, %d collected, %.6fs',
+            stats.operation, stats.model._meta.label, stats.queries,
+            stats.rows, stats.collected, stats.elapsed,
+        )
+
+
+def get_backend():
+    """Return the backend configured by ``SAFE_DELETE_METRICS_BACKEND``, or ``None``.
+
+    The setting is the dotted path of a class whose instances have a
+    ``record(stats)`` method, e.g. ``'safedelete.metrics.LoggingBackend'``.
+    """
+    path = getattr(settings, 'SAFE_DELETE_METRICS_BACKEND', None)
+    if not path:
+        return None
+    try:
+        return _backends[path]
+    except KeyError:
+        backend = _backends[path] = import_string(path)()
+        return backend
+
+
+def is_enabled():
+    return bool(getattr(_local, 'collectors', None)) or get_backend() is not None
+
+
+@contextmanager
+def collect_stats():
+    """Collect the stats of the safedelete operations run within the block.
+
+    >>> with collect_stats() as stats:
+    ...     author.delete()
+    >>> stats.totals()['model.delete']['queries']
+
+    Nested operations are reported on their own too (e.g. ``related_pks``
+    within a cascade ``model.delete``), and their queries are also counted
+    in the enclosing operation.
+    """
+    collector = StatsCollector()
+    collectors = _local.__dict__.setdefault('collectors', [])
+    collectors.append(collector)
+    try:
+        yield collector
+    finally:
+        collectors.remove(collector)
+
+
+def _count_query(execute, sql, params, many, context):
+    for stats in _local.running:
+        if stats.using == context['connection'].alias:
+            stats.queries += 1
+    return execute(sql, params, many, context)
+
+
+@contextmanager
+def _running(stats):
+    """Measure the time and queries of ``stats`` within the block."""
+    running = _local.__dict__.setdefault('running', [])
+    wrapped = _local.__dict__.setdefault('wrapped', set())
+    connection = connections[stats.using]
+    wrap = stats.using not in wrapped and hasattr(connection, 'execute_wrapper')
+    running.append(stats)
+    start = default_timer()
+    try:
+        if wrap:
+            wrapped.add(stats.using)
+            with connection.execute_wrapper(_count_query):
+                yield
+        else:
+            yield
+    finally:
+        stats.elapsed += default_timer() - start
+        running.pop()
+        if wrap:
+            wrapped.discard(stats.using)
+
+
+def _report(stats):
+    backend = get_backend()
+    if backend is not None:
+        backend.record(stats)
+    for collector in getattr(_local, 'collectors', ()):
+        collector.record(stats)
+
+
+def _current(operation):
+    for stats in getattr(_local, 'running', ()):
+        if stats.operation == operation:
+            return stats
+    return None
+
+
+def instrumented(operation):
+    """Decorator measuring a model or queryset method returning ``(count, per_model)``.
+
+    A method calling itself (e.g. ``delete()`` with ``HARD_DELETE_NOCASCADE``)
+    is measured as a single operation.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not is_enabled() or _current(operation) is not None:
+                return method(self, *args, **kwargs)
+
+            if isinstance(self, QuerySet):
+                model = self.model
+                self._for_write = True
+                using = self.db
+            else:
+                model = self.__class__
+                using = kwargs.get('using') or router.db_for_write(model, instance=self)
+            stats = OperationStats(operation, model, using)
+            with _running(stats):
+                result = method(self, *args, **kwargs)
+            if result is not None:
+                stats.rows = result[0]
+            _report(stats)
+            return result
+        return wrapper
+    return decorator
+
+
+def instrumented_iter(operation, model, using, iterator):
+    """Measure the collection of related objects by ``iterator``.
+
+    Only the time and queries spent producing the items are measured, not the
+    work done by the consumer between them.
+    """
+    if not is_enabled():
+        return iterator
+    return _instrumented_iter(OperationStats(operation, model, using), iterator)
+
+
+def _instrumented_iter(stats, iterator):
+    try:
+        while True:
+            with _running(stats):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            stats.collected += 1
+            yield item
+    finally:
+        _report(stats)
@@ -1,24 +1,95 @@
 import warnings
+from collections import Counter, OrderedDict, namedtuple
 
-from django.db import models, router
+from django.conf import settings
+from django.db import models, router, transaction
+from django.db.models import Q
 from django.utils import timezone
 
+from .cascade import CascadeTask, get_cascade_executor
 from .config import (HARD_DELETE, HARD_DELETE_NOCASCADE, NO_DELETE,
                      SOFT_DELETE, SOFT_DELETE_CASCADE)
+from .dispatch import send_post_signal
 from .managers import (SafeDeleteAllManager, SafeDeleteDeletedManager,
                        SafeDeleteManager)
-from .signals import post_softdelete, post_undelete, pre_softdelete
-from .utils import can_hard_delete, related_objects
+from .metrics import instrumented
+from .signals import (post_softdelete, post_softdelete_batch, post_undelete,
+                      post_undelete_batch, pre_softdelete, pre_softdelete_batch)
+from .utils import (HAS_ASYNCIO, bulk_set_deleted, can_hard_delete, chunks,
+                    get_batch_size, group_by_model, has_receivers, related_pks)
+
+if HAS_ASYNCIO:
+    from . import aio
+
+
+SafeDeleteMeta = namedtuple('SafeDeleteMeta', [
+    'is_safedelete', 'has_unique_fields', 'unique_fields',
+])
+SafeDeleteMeta.__doc__ = """Safedelete metadata of a model class, see :func:`get_safedelete_meta`."""
+
+# Metadata per model class, filled by SafeDeleteConfig.ready() and when classes are prepared.
+_safedelete_meta = {}
+
+
+def get_safedelete_meta(cls):
+    """Return the :class:`SafeDeleteMeta` of a model class.
+
+    It tells whether the class is a safedelete model, whether it has fields
+    with ``unique=True`` and its unique field groups (see :func:`get_unique_fields`),
+    both ``None`` for other models, and is computed once per class. The policy
+    is not cached, ``_safedelete_policy`` can be changed on the class.
+    """
+    try:
+        return _safedelete_meta[cls]
+    except KeyError:
+        return register_safedelete_meta(cls)
+
+
+def register_safedelete_meta(cls):
+    """Compute and store the :class:`SafeDeleteMeta` of a model class."""
+    if _is_safedelete_cls(cls):
+        meta = SafeDeleteMeta(
+            True, any(field._unique for field in cls._meta.fields), get_unique_fields(cls),
+        )
+    else:
+        meta = SafeDeleteMeta(False, None, None)
+    _safedelete_meta[cls] = meta
+    return meta
+
+
+def get_unique_fields(cls):
+    """Return the unique field groups of a model class, as a frozenset of frozensets of field names.
+
+    The primary key, the unique fields and the ``unique_together`` groups of
+    the class and its parents are included.
+    """
+    groups = set()
+    for model in [cls] + cls._meta.get_parent_list():
+        for unique_together in model._meta.unique_together:
+            groups.add(frozenset(unique_together))
+    for field in cls._meta.fields:
+        if field.unique:
+            groups.add(frozenset([field.name]))
+    return frozenset(groups)
+
+
+def class_prepared_receiver(sender, **kwargs):
+    """``class_prepared`` receiver connected by :class:`safedelete.apps.SafeDeleteConfig`."""
+    register_safedelete_meta(sender)
 
 
 def is_safedelete_cls(cls):
+    return get_safedelete_meta(cls).is_safedelete
+
+
+def _is_safedelete_cls(cls):
     for base in cls.__bases__:
         # This used to check if it startswith 'safedelete', but that masks
         # the issue inside of a test. Other clients create models that are
         # outside of the safedelete package.
         if base.__module__.startswith('safedelete.models'):
             return True
-        if is_safedelete_cls(base):
+        if _is_safedelete_cls(base):
             return True
     return False
 
@@ -30,6 +101,86 @@ def is_safedelete(related):
     return is_safedelete_cls(related.__class__)
 
 
+def soft_delete_related(obj, deleted, using, progress=None):
+    """Soft delete the objects that would be deleted in cascade with ``obj``.
+
+    The related safedelete objects which are not deleted yet are grouped by model,
+    and each model is updated with one query per ``SAFE_DELETE_BATCH_SIZE`` objects.
+
+    Args:
+        obj: Object being deleted.
+        deleted: Deletion datetime to set on the related objects.
+        using: Database alias.
+        progress: Function called with the model and the number of objects
+            after each batch. (default: {None})
+
+    Returns a :class:`collections.Counter` of the soft deleted objects per model label.
+    """
+    return _set_related_deleted(
+        obj, deleted, using, {'deleted__isnull': True},
+        pre_signal=pre_softdelete, post_signal=post_softdelete,
+        pre_batch_signal=pre_softdelete_batch, post_batch_signal=post_softdelete_batch,
+        progress=progress,
+    )
+
+
+def undelete_related(obj, deleted, using):
+    """Undelete the objects soft deleted in cascade with ``obj``.
+
+    Only the related objects sharing the deletion datetime of ``obj`` are
+    undeleted, in bulk like :func:`soft_delete_related`. With the
+    ``SAFE_DELETE_UNDELETE_ALL_RELATED`` setting, all the soft deleted related
+    objects are undeleted instead, like before 0.5.2.
+
+    Args:
+        obj: Object being undeleted.
+        deleted: Deletion datetime ``obj`` had before being undeleted.
+        using: Database alias.
+
+    Returns a :class:`collections.Counter` of the undeleted objects per model label.
+    """
+    if getattr(settings, 'SAFE_DELETE_UNDELETE_ALL_RELATED', False):
+        filters = {'deleted__isnull': False}
+    else:
+        filters = {'deleted': deleted}
+    return _set_related_deleted(
+        obj, None, using, filters,
+        post_signal=post_undelete, post_batch_signal=post_undelete_batch,
+    )
+
+
+def _set_related_deleted(obj, deleted, using, filters, pre_signal=None, post_signal=None,
+                         pre_batch_signal=None, post_batch_signal=None, progress=None):
+    """Write ``deleted`` on the related safedelete objects of ``obj`` matching ``filters``.
+
+    The primary keys streamed by :func:`related_pks` are buffered per model and
+    flushed every ``SAFE_DELETE_BATCH_SIZE`` objects. The instances are only
+    loaded when the per-instance signals have receivers, and the objects are
+    updated without reading them when no signal has receivers.
+    """
+    counter = Counter()
+    pairs = ((model, pk) for model, pk in related_pks(obj) if is_safedelete_cls(model))
+    for model, pks in group_by_model(pairs, get_batch_size()):
+        queryset = model._base_manager.using(using).filter(pk__in=pks, **filters)
+        if not has_receivers(model, pre_signal, post_signal, pre_batch_signal, post_batch_signal):
+            count = queryset.update(deleted=deleted)
+        else:
+            if has_receivers(model, pre_signal, post_signal):
+                objs = list(queryset)
+            else:
+                objs = list(queryset.values_list('pk', flat=True))
+            count = bulk_set_deleted(
+                model, objs, deleted, using,
+                pre_signal=pre_signal, post_signal=post_signal,
+                pre_batch_signal=pre_batch_signal, post_batch_signal=post_batch_signal,
+            ) if objs else 0
+        if count:
+            counter[model._meta.label] += count
+            if progress is not None:
+                progress(model, count)
+    return counter
+
+
 class SafeDeleteModel(models.Model):
     """Abstract safedelete-ready model.
 
@@ -96,11 +247,12 @@ class SafeDeleteModel(models.Model):
 
         super(SafeDeleteModel, self).save(**kwargs)
 
-        if was_undeleted:
+        if was_undeleted and post_undelete.has_listeners(self.__class__):
             # send undelete signal
             using = kwargs.get('using') or router.db_for_write(self.__class__, instance=self)
-            post_undelete.send(sender=self.__class__, instance=self, using=using)
+            send_post_signal(post_undelete, self.__class__, using, instance=self)
 
+    @instrumented('model.undelete')
     def undelete(self, force_policy=None, **kwargs):
         """Undelete a soft-deleted model.
 
@@ -108,107 +260,178 @@ class SafeDeleteModel(models.Model):
             force_policy: Force a specific undelete policy. (default: {None})
             kwargs: Passed onto :func:`save`.
 
+        Returns the number of objects undeleted and a dictionary with the number
+        of undeletions per model type.
+
         .. note::
             Will raise a :class:`AssertionError` if the model was not soft-deleted.
+
+        .. note::
+            Only the ``deleted`` field (and the ``update_fields`` given in ``kwargs``)
+            is written, the other changes are not saved.
+
+        .. note::
+            With ``SOFT_DELETE_CASCADE``, only the related objects soft deleted in the
+            same cascade are undeleted, in bulk within the same transaction.
         """
         current_policy = force_policy or self._safedelete_policy
 
         assert self.deleted
-        self.save(keep_deleted=False, **kwargs)
-
-        if current_policy == SOFT_DELETE_CASCADE:
-            for related in related_objects(self):
-                if is_safedelete_cls(related.__class__) and related.deleted:
-                    related.undelete()
-
+        kwargs = self._deleted_save_kwargs(kwargs)
+        if current_policy != SOFT_DELETE_CASCADE:
+            self.save(keep_deleted=False, **kwargs)
+            return 1, {self._meta.label: 1}
+
+        deleted = self.deleted
+        using = kwargs.get('using') or router.db_for_write(self.__class__, instance=self)
+        with transaction.atomic(using=using):
+            self.save(keep_deleted=False, **kwargs)
+            counter = undelete_related(self, deleted, using)
+        counter[self._meta.label] += 1
+        return sum(counter.values()), dict(counter)
+
+    @instrumented('model.delete')
     def delete(self, force_policy=None, **kwargs):
         """Overrides Django's delete behaviour based on the model's delete policy.
 
         Args:
             force_policy: Force a specific delete policy. (default: {None})
             kwargs: Passed onto :func:`save` if soft deleted.
+
+        Returns the number of objects deleted and a dictionary with the number
+        of deletions per model type, like :func:`django.db.models.Model.delete`.
+
+        .. note::
+            Soft deleting an object only writes its ``deleted`` field (and the
+            ``update_fields`` given in ``kwargs``), the other changes are not saved.
+            When ``pre_softdelete`` has receivers, the whole object is saved
+            instead, with the changes made by the receivers.
+
+        .. note::
+            With ``SOFT_DELETE_CASCADE``, the related objects are soft deleted in bulk
+            within the same transaction, so their own ``delete`` method is not called.
+            When ``SAFE_DELETE_CASCADE_EXECUTOR`` is set, they are soft deleted in
+            the background instead, see :mod:`safedelete.cascade`.
         """
         current_policy = self._safedelete_policy if (force_policy is None) else force_policy
 
         if current_policy == NO_DELETE:
 
             # Don't do anything.
-            return
+            return 0, {}
 
         elif current_policy == SOFT_DELETE:
 
             # Only soft-delete the object, marking it as deleted.
-            self.deleted = timezone.now()
-            using = kwargs.get('using') or router.db_for_write(self.__class__, instance=self)
-            # send pre_softdelete signal
-            pre_softdelete.send(sender=self.__class__, instance=self, using=using)
-            super(SafeDeleteModel, self).save(**kwargs)
-            # send softdelete signal
-            post_softdelete.send(sender=self.__class__, instance=self, using=using)
+            return self._soft_delete(timezone.now(), **kwargs)
 
         elif current_policy == HARD_DELETE:
 
             # Normally hard-delete the object.
-            super(SafeDeleteModel, self).delete()
+            return super(SafeDeleteModel, self).delete()
 
         elif current_policy == HARD_DELETE_NOCASCADE:
 
             # Hard-delete the object only if nothing would be deleted with it
 
             if not can_hard_delete(self):
-                self.delete(force_policy=SOFT_DELETE, **kwargs)
+                return self.delete(force_policy=SOFT_DELETE, **kwargs)
             else:
-                self.delete(force_policy=HARD_DELETE, **kwargs)
+                return self.delete(force_policy=HARD_DELETE, **kwargs)
 
         elif current_policy == SOFT_DELETE_CASCADE:
-            # Soft-delete on related objects before
-            for related in related_objects(self):
-                if is_safedelete_cls(related.__class__) and not related.deleted:
-                    related.delete(force_policy=SOFT_DELETE, **kwargs)
-            # soft-delete the object
-            self.delete(force_policy=SOFT_DELETE, **kwargs)
+            # The related objects share the deletion datetime of this object.
+            deleted = timezone.now()
+            using = kwargs.get('using') or router.db_for_write(self.__class__, instance=self)
+            executor = get_cascade_executor()
+            if executor is not None:
+                # Only soft delete this object, the executor runs the cascade.
+                with transaction.atomic(using=using):
+                    result = self._soft_delete(deleted, **kwargs)
+                    executor.submit(CascadeTask(self._meta.label, self.pk, deleted, using))
+                return result
+            with transaction.atomic(using=using):
+                # Soft-delete on related objects before
+                counter = soft_delete_related(self, deleted, using)
+                # soft-delete the object
+                counter.update(self._soft_delete(deleted, **kwargs)[1])
+            return sum(counter.values()), dict(counter)
+
+    if HAS_ASYNCIO:
+        adelete = aio.model_adelete
+        aundelete = aio.model_aundelete
+
+    def _soft_delete(self, deleted, **kwargs):
+        self.deleted = deleted
+        # The database is only needed by the signals, skip the router without receivers.
+        send_pre = pre_softdelete.has_listeners(self.__class__)
+        send_post = post_softdelete.has_listeners(self.__class__)
+        if send_pre or send_post:
+            using = kwargs.get('using') or router.db_for_write(self.__class__, instance=self)
+        # send pre_softdelete signal
+        if send_pre:
+            pre_softdelete.send(sender=self.__class__, instance=self, using=using)
+        # The pre_softdelete receivers may change the object, e.g. to record who deleted it:
+        # save all its fields then.
+        super(SafeDeleteModel, self).save(**(kwargs if send_pre else self._deleted_save_kwargs(kwargs)))
+        # send softdelete signal
+        if send_post:
+            send_post_signal(post_softdelete, self.__class__, using, instance=self)
+        return 1, {self._meta.label: 1}
+
+    def _deleted_save_kwargs(self, kwargs):
+        """Return the ``save`` kwargs writing only the ``deleted`` field of a saved object.
+
+        The other fields given in ``update_fields`` are kept. Unsaved objects are saved entirely.
+        """
+        if self._state.adding or self.pk is None:
+            return kwargs
+        kwargs = dict(kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            kwargs['update_fields'] = ['deleted']
+        elif 'deleted' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['deleted']
+        return kwargs
 
     @classmethod
     def has_unique_fields(cls):
         """Checks if one of the fields of this model has a unique constraint set (unique=True)
 
-        Args:
-            model: Model instance to check
+        The result is computed once per model, see :func:`get_safedelete_meta`.
         """
-        for field in cls._meta.fields:
-            if field._unique:
-                return True
-        return False
+        return get_safedelete_meta(cls).has_unique_fields
 
     # We need to overwrite this check to ensure uniqueness is also checked
     # against "deleted" (but still in db) objects.
     # FIXME: Better/cleaner way ?
     def _perform_unique_checks(self, unique_checks):
+        """Check the unique constraints against all the objects, deleted ones included.
+
+        The checks of each model class are combined into a single query: the
+        rows matching any of them are aggregated with one flag per check, which
+        tells the constraints that fired.
+        """
         errors = {}
 
+        checks = OrderedDict()
         for model_class, unique_check in unique_checks:
-            lookup_kwargs = {}
-            for field_name in unique_check:
-                f = self._meta.get_field(field_name)
-                lookup_value = getattr(self, f.attname)
-                if lookup_value is None:
-                    continue
-                if f.primary_key and not self._state.adding:
-                    continue
-                lookup_kwargs[str(field_name)] = lookup_value
-            if len(unique_check) != len(lookup_kwargs):
-                continue
+            lookup_kwargs = self._unique_check_lookup(unique_check)
+            if lookup_kwargs is not None:
+                checks.setdefault(model_class, []).append((unique_check, Q(**lookup_kwargs)))
 
+        for model_class, model_checks in checks.items():
             # This is the changed line
             if hasattr(model_class, 'all_objects'):
-                qs = model_class.all_objects.filter(**lookup_kwargs)
+                qs = model_class.all_objects.all()
             else:
-                qs = model_class._default_manager.filter(**lookup_kwargs)
+                qs = model_class._default_manager.all()
 
             model_class_pk = self._get_pk_val(model_class._meta)
             if not self._state.adding and model_class_pk is not None:
                 qs = qs.exclude(pk=model_class_pk)
-            if qs.exists():
+
+            for unique_check in _fired_unique_checks(qs, model_checks):
                 if len(unique_check) == 1:
                     key = unique_check[0]
                 else:
@@ -218,6 +441,125 @@ class SafeDeleteModel(models.Model):
                 )
         return errors
 
+    @classmethod
+    def bulk_validate_unique(cls, instances, exclude=None):
+        """Check the unique constraints of many instances against all the objects, deleted ones included.
+
+        Each constraint is checked with ``IN`` queries by chunks of
+        ``SAFE_DELETE_BATCH_SIZE`` instances instead of one query per instance,
+        and the instances conflicting with each other are reported too: every
+        instance repeating the values of a previous one gets an error.
+
+        Args:
+            instances: Instances of this model to validate, usually unsaved.
+            exclude: Field names to exclude from the checks, like
+                :func:`django.db.models.Model.validate_unique`. (default: {None})
+
+        Returns a dictionary of the errors of each invalid instance, keyed by
+        its index in ``instances`` (unsaved instances cannot be hashed). The
+        errors are given per field like in :func:`validate_unique`, so
+        ``ValidationError(errors[index])`` is what it would raise.
+
+        .. note::
+            The values are compared in Python, so database collations (e.g.
+            case insensitive ones) are not taken into account.
+        """
+        instances = list(instances)
+        if not instances:
+            return {}
+        errors = {}
+        unique_checks = instances[0]._get_unique_checks(exclude=exclude)[0]
+        for model_class, unique_check in unique_checks:
+            for index in _bulk_unique_conflicts(model_class, unique_check, instances):
+                if len(unique_check) == 1:
+                    key = unique_check[0]
+                else:
+                    key = models.base.NON_FIELD_ERRORS
+                errors.setdefault(index, {}).setdefault(key, []).append(
+                    instances[index].unique_error_message(model_class, unique_check)
+                )
+        return errors
+
+    def _unique_check_lookup(self, unique_check):
+        """Return the lookup of the objects conflicting with ``self`` for a unique check.
+
+        Returns ``None`` when the check does not apply, e.g. one of the values is ``None``.
+        """
+        lookup_kwargs = {}
+        for field_name in unique_check:
+            f = self._meta.get_field(field_name)
+            lookup_value = getattr(self, f.attname)
+            if lookup_value is None:
+                continue
+            if f.primary_key and not self._state.adding:
+                continue
+            lookup_kwargs[str(field_name)] = lookup_value
+        if len(unique_check) != len(lookup_kwargs):
+            return None
+        return lookup_kwargs
+
+
+def _bulk_unique_conflicts(model_class, unique_check, instances):
+    """Yield the indexes of the ``instances`` conflicting with existing objects or previous instances for a unique check."""
+    attnames = [model_class._meta.get_field(field_name).attname for field_name in unique_check]
+    if hasattr(model_class, 'all_objects'):
+        manager = model_class.all_objects
+    else:
+        manager = model_class._default_manager
+
+    # Values of each instance the check applies to, and the first instance with these values.
+    pending = []
+    first_index = {}
+    for index, instance in enumerate(instances):
+        lookup_kwargs = instance._unique_check_lookup(unique_check)
+        if lookup_kwargs is None:
+            continue
+        values = tuple(lookup_kwargs[str(field_name)] for field_name in unique_check)
+        pk = instance._get_pk_val(model_class._meta) if not instance._state.adding else None
+        if values in first_index:
+            yield index
+        else:
+            first_index[values] = index
+            pending.append((index, values, pk))
+
+    for chunk in chunks(pending, get_batch_size()):
+        lookup = {
+            '%s__in' % field_name: {values[i] for index, values, pk in chunk}
+            for i, field_name in enumerate(unique_check)
+        }
+        existing = {}
+        for row in manager.filter(**lookup).values_list('pk', *attnames):
+            existing.setdefault(tuple(row[1:]), set()).add(row[0])
+        for index, values, pk in chunk:
+            if existing.get(values, set()) - {pk}:
+                yield index
+
+
+def _fired_unique_checks(queryset, checks):
+    """Return the unique checks of ``checks`` matched by objects of ``queryset``, with one query.
+
+    Args:
+        queryset: Objects to check against.
+        checks: List of ``(unique_check, condition)`` pairs, ``condition``
+            being the ``Q`` object matching the conflicting objects.
+    """
+    if len(checks) == 1:
+        unique_check, condition = checks[0]
+        return [unique_check] if queryset.filter(condition).exists() else []
+
+    any_condition = Q()
+    for unique_check, condition in checks:
+        any_condition |= condition
+    flags = queryset.filter(any_condition).aggregate(**{
+        'check_%d' % i: models.Max(models.Case(
+            models.When(condition, then=models.Value(1)),
+            default=models.Value(0),
+            output_field=models.IntegerField(),
+        ))
+        for i, (unique_check, condition) in enumerate(checks)
+    })
+    return [unique_check for i, (unique_check, condition) in enumerate(checks) if flags['check_%d' % i]]
+
 
 class SafeDeleteMixin(SafeDeleteModel):
     """``SafeDeleteModel`` was previously named ``SafeDeleteMixin``.
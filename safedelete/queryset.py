@@ -1,11 +1,22 @@
-from distutils.version import LooseVersion
+from collections import Counter
 
 import django
+from django.db import transaction
 from django.db.models import query
 from django.db.models.query_utils import Q
+from django.utils import timezone
 
 from .config import (DELETED_INVISIBLE, DELETED_ONLY_VISIBLE, DELETED_VISIBLE,
-                     DELETED_VISIBLE_BY_FIELD)
+                     DELETED_VISIBLE_BY_FIELD, HARD_DELETE_NOCASCADE,
+                     SOFT_DELETE, SOFT_DELETE_CASCADE)
+from .metrics import instrumented
+from .signals import (post_softdelete, post_softdelete_batch, post_undelete,
+                      post_undelete_batch, pre_softdelete, pre_softdelete_batch)
+from .utils import (HAS_ASYNCIO, bulk_set_deleted, dependents_filter,
+                    get_batch_size, has_receivers, keyset_pages)
+
+if HAS_ASYNCIO:
+    from . import aio
 
 
 class SafeDeleteQueryset(query.QuerySet):
@@ -17,41 +28,180 @@ class SafeDeleteQueryset(query.QuerySet):
     QuerySet itself is evaluated.
     """
     _safedelete_filter_applied = False
+    _safedelete_force_visibility = None
 
-    def delete(self, force_policy=None):
+    @instrumented('queryset.delete')
+    def delete(self, force_policy=None, send_signals=True):
         """Overrides bulk delete behaviour.
 
+        When the policy is ``SOFT_DELETE``, the objects are masked with
+        ``UPDATE`` queries instead of being deleted one by one.
+
+        When the policy is ``HARD_DELETE_NOCASCADE``, the objects are split in
+        SQL between those which would delete other objects with them, masked
+        in bulk, and the others, deleted with Django's bulk delete.
+
+        Args:
+            force_policy: Force a specific delete policy. (default: {None})
+            send_signals: Send the ``pre_softdelete`` and ``post_softdelete``
+                signals, and their ``_batch`` variants, when soft deleting in bulk. (default: {True})
+
         .. note::
-            The current implementation loses performance on bulk deletes in order
+            The bulk deletes do not call ``SafeDeleteModel.delete``, so
+            overriding it in your model has no effect there. When signals are
+            sent, the objects are updated with one query per chunk of
+            ``SAFE_DELETE_BATCH_SIZE``, and the batch signals are sent once per
+            chunk. The objects are only loaded when the per-instance signals
+            have receivers. Otherwise a single query is used.
+
+            The other policies lose performance on bulk deletes in order
             to safely delete objects according to the deletion policies set.
 
+        Returns the number of objects deleted and a dictionary with the number
+        of deletions per model type, like :func:`django.db.models.query.QuerySet.delete`.
+
         .. seealso::
             :py:func:`safedelete.models.SafeDeleteModel.delete`
         """
         assert self.query.can_filter(), "Cannot use 'limit' or 'offset' with delete."
-        # TODO: Replace this by bulk update if we can
-        for obj in self.all():
-            obj.delete(force_policy=force_policy)
+        self._filter_visibility()
+        current_policy = self.model._safedelete_policy if (force_policy is None) else force_policy
+
+        counter = Counter()
+        dependents = None
+        if current_policy == HARD_DELETE_NOCASCADE:
+            self._for_write = True
+            dependents = dependents_filter(self.model, self.db)
+
+        if current_policy == SOFT_DELETE:
+            count = self._soft_delete(send_signals=send_signals)
+            if count:
+                counter[self.model._meta.label] = count
+        elif dependents is not None:
+            with transaction.atomic(using=self.db):
+                count = self.filter(dependents)._soft_delete(send_signals=send_signals)
+                if count:
+                    counter[self.model._meta.label] = count
+                counter.update(super(SafeDeleteQueryset, self.exclude(dependents)).delete()[1])
+        else:
+            for obj in self.all():
+                deleted = obj.delete(force_policy=force_policy)
+                if deleted is not None:
+                    counter.update(deleted[1])
         self._result_cache = None
+        return sum(counter.values()), dict(counter)
     delete.alters_data = True
 
-    def undelete(self, force_policy=None):
+    if HAS_ASYNCIO:
+        adelete = aio.queryset_adelete
+
+    def _soft_delete(self, send_signals=True):
+        """Mark all the objects of the QuerySet as deleted, returns the number of updated rows."""
+        return self._set_deleted(
+            timezone.now(), send_signals,
+            pre_signal=pre_softdelete, post_signal=post_softdelete,
+            pre_batch_signal=pre_softdelete_batch, post_batch_signal=post_softdelete_batch,
+        )
+
+    def _undelete(self, send_signals=True):
+        """Restore all the soft deleted objects of the QuerySet, returns the number of updated rows."""
+        return self.filter(deleted__isnull=False)._set_deleted(
+            None, send_signals,
+            post_signal=post_undelete, post_batch_signal=post_undelete_batch,
+        )
+
+    def _set_deleted(self, deleted, send_signals, pre_signal=None, post_signal=None,
+                     pre_batch_signal=None, post_batch_signal=None):
+        """Write ``deleted`` on all the objects of the QuerySet.
+
+        Without signals, or when none of them has receivers, this is a single
+        ``UPDATE`` query. Otherwise the primary keys are read by chunks for the
+        batch signals, and the objects are loaded instead when the per-instance
+        signals have receivers.
+        """
+        if not send_signals or not has_receivers(
+                self.model, pre_signal, post_signal, pre_batch_signal, post_batch_signal):
+            return self.update(deleted=deleted)
+
+        self._for_write = True
+        using = self.db
+        if has_receivers(self.model, pre_signal, post_signal):
+            chunks = self._chunks()
+        else:
+            chunks = keyset_pages(self, get_batch_size())
+        count = 0
+        for chunk in chunks:
+            count += bulk_set_deleted(
+                self.model, chunk, deleted, using, pre_signal, post_signal,
+                pre_batch_signal, post_batch_signal,
+            )
+        return count
+
+    def _chunks(self, batch_size=None):
+        """Yield the objects of the QuerySet as lists, using keyset pagination on the primary key.
+
+        The QuerySet is not cached, and rows updated while iterating do not
+        shift the following chunks.
+        """
+        batch_size = batch_size or get_batch_size()
+        queryset = self.order_by('pk')
+        last_pk = None
+        while True:
+            chunk_qs = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            chunk = list(chunk_qs[:batch_size])
+            if not chunk:
+                return
+            yield chunk
+            if len(chunk) < batch_size:
+                return
+            last_pk = chunk[-1].pk
+
+    @instrumented('queryset.undelete')
+    def undelete(self, force_policy=None, send_signals=True):
         """Undelete all soft deleted models.
 
+        Unless the policy is ``SOFT_DELETE_CASCADE``, the objects are restored
+        with ``UPDATE`` queries instead of being saved one by one.
+
+        Args:
+            force_policy: Force a specific undelete policy. (default: {None})
+            send_signals: Send the ``post_undelete`` and ``post_undelete_batch`` signals
+                when undeleting in bulk. (default: {True})
+
         .. note::
-            The current implementation loses performance on bulk undeletes in
-            order to call the pre/post-save signals.
+            The bulk undelete only writes the ``deleted`` field, so the
+            pre/post-save signals are not sent. When signals are sent, the
+            objects are updated with one query per chunk of ``SAFE_DELETE_BATCH_SIZE``
+            like the bulk soft delete, otherwise a single query is used.
+
+            The ``SOFT_DELETE_CASCADE`` policy loses performance on bulk
+            undeletes in order to undelete the related objects.
+
+        Returns the number of objects undeleted and a dictionary with the number
+        of undeletions per model type.
 
         .. seealso::
             :py:func:`safedelete.models.SafeDeleteModel.undelete`
         """
         assert self.query.can_filter(), "Cannot use 'limit' or 'offset' with undelete."
-        # TODO: Replace this by bulk update if we can (need to call pre/post-save signal)
-        for obj in self.all():
-            obj.undelete(force_policy=force_policy)
+        self._filter_visibility()
+        current_policy = self.model._safedelete_policy if (force_policy is None) else force_policy
+
+        counter = Counter()
+        if current_policy == SOFT_DELETE_CASCADE:
+            for obj in self.all():
+                counter.update(obj.undelete(force_policy=force_policy)[1])
+        else:
+            count = self._undelete(send_signals=send_signals)
+            if count:
+                counter[self.model._meta.label] = count
         self._result_cache = None
+        return sum(counter.values()), dict(counter)
     undelete.alters_data = True
 
+    if HAS_ASYNCIO:
+        aundelete = aio.queryset_aundelete
+
     def all(self, force_visibility=None):
         """Override so related managers can also see the deleted models.
 
@@ -93,7 +243,7 @@ class SafeDeleteQueryset(query.QuerySet):
         Unlike QuerySet.filter, this does not return a clone.
         This is because QuerySet._fetch_all cannot work with a clone.
         """
-        force_visibility = getattr(self, '_safedelete_force_visibility', None)
+        force_visibility = self._safedelete_force_visibility
         visibility = force_visibility \
             if force_visibility is not None \
             else self._safedelete_visibility
@@ -123,31 +273,70 @@ class SafeDeleteQueryset(query.QuerySet):
 
         return super(SafeDeleteQueryset, self).__getitem__(key)
 
-    def __getattribute__(self, name):
-        """Methods that do not return a QuerySet should call ``_filter_visibility`` first."""
-        attr = object.__getattribute__(self, name)
-        # These methods evaluate the queryset and therefore need to filter the
-        # visiblity set.
-        evaluation_methods = (
-            '_fetch_all', 'count', 'exists', 'aggregate', 'update', '_update',
-            'delete', 'undelete', 'iterator', 'first', 'last', 'latest', 'earliest'
-        )
-        if hasattr(attr, '__call__') and name in evaluation_methods:
-            def decorator(*args, **kwargs):
-                self._filter_visibility()
-                return attr(*args, **kwargs)
-            return decorator
-        return attr
-
-    def _clone(self, klass=None, **kwargs):
-        """Called by django when cloning a QuerySet."""
-        if LooseVersion(django.get_version()) < LooseVersion('1.9'):
-            clone = super(SafeDeleteQueryset, self)._clone(klass, **kwargs)
-        else:
-            clone = super(SafeDeleteQueryset, self)._clone(**kwargs)
+    # The following methods evaluate the queryset and therefore need to filter
+    # the visibility set first. ``delete`` and ``undelete`` do it too.
+
+    def _fetch_all(self):
+        self._filter_visibility()
+        return super(SafeDeleteQueryset, self)._fetch_all()
+
+    def count(self):
+        self._filter_visibility()
+        return super(SafeDeleteQueryset, self).count()
+
+    def exists(self):
+        self._filter_visibility()
+        return super(SafeDeleteQueryset, self).exists()
+
+    def aggregate(self, *args, **kwargs):
+        self._filter_visibility()
+        return super(SafeDeleteQueryset, self).aggregate(*args, **kwargs)
+
+    def update(self, **kwargs):
+        self._filter_visibility()
+        return super(SafeDeleteQueryset, self).update(**kwargs)
+    update.alters_data = True
+
+    def _update(self, values):
+        self._filter_visibility()
+        return super(SafeDeleteQueryset, self)._update(values)
+    _update.alters_data = True
+    _update.queryset_only = False
+
+    def iterator(self, *args, **kwargs):
+        self._filter_visibility()
+        return super(SafeDeleteQueryset, self).iterator(*args, **kwargs)
+
+    def first(self):
+        self._filter_visibility()
+        return super(SafeDeleteQueryset, self).first()
+
+    def last(self):
+        self._filter_visibility()
+        return super(SafeDeleteQueryset, self).last()
+
+    def latest(self, *args, **kwargs):
+        self._filter_visibility()
+        return super(SafeDeleteQueryset, self).latest(*args, **kwargs)
+
+    def earliest(self, *args, **kwargs):
+        self._filter_visibility()
+        return super(SafeDeleteQueryset, self).earliest(*args, **kwargs)
+
+    # The signature of QuerySet._clone() depends on the Django version,
+    # pick the right override once.
+    if django.VERSION < (1, 9):
+        def _clone(self, klass=None, **kwargs):
+            """Called by django when cloning a QuerySet."""
+            return self._clone_safedelete(super(SafeDeleteQueryset, self)._clone(klass, **kwargs))
+    else:
+        def _clone(self, **kwargs):
+            """Called by django when cloning a QuerySet."""
+            return self._clone_safedelete(super(SafeDeleteQueryset, self)._clone(**kwargs))
+
+    def _clone_safedelete(self, clone):
         clone._safedelete_visibility = self._safedelete_visibility
         clone._safedelete_visibility_field = self._safedelete_visibility_field
         clone._safedelete_filter_applied = self._safedelete_filter_applied
-        if hasattr(self, '_safedelete_force_visibility'):
-            clone._safedelete_force_visibility = self._safedelete_force_visibility
+        clone._safedelete_force_visibility = self._safedelete_force_visibility
         return clone
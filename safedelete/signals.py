@@ -3,3 +3,8 @@ from django.db.models.signals import ModelSignal
 pre_softdelete = ModelSignal(providing_args=["instance", "using"], use_caching=True)
 post_softdelete = ModelSignal(providing_args=["instance", "using"], use_caching=True)
 post_undelete = ModelSignal(providing_args=["instance", "using"], use_caching=True)
+
+# Sent once per model and batch by the bulk operations, with the primary keys of the objects.
+pre_softdelete_batch = ModelSignal(providing_args=["pks", "using", "deleted"], use_caching=True)
+post_softdelete_batch = ModelSignal(providing_args=["pks", "using", "deleted"], use_caching=True)
+post_undelete_batch = ModelSignal(providing_args=["pks", "using"], use_caching=True)
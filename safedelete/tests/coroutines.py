@@ -0,0 +1,14 @@
+"""Coroutines of test_aio, which use the async syntax of Python 3.5+."""
+import asyncio
+
+from django.db import transaction
+
+
+async def delete_all(*objs):
+    return await asyncio.gather(*[obj.adelete() for obj in objs])
+
+
+async def delete_in_atomic(obj):
+    with transaction.atomic():
+        await obj.adelete()
+        raise ValueError
@@ -0,0 +1,116 @@
+import threading
+
+from django.db import models
+from django.test import override_settings
+
+from ..config import SOFT_DELETE, SOFT_DELETE_CASCADE
+from ..models import SafeDeleteModel
+from ..signals import pre_softdelete_batch
+from ..utils import HAS_ASYNCIO
+
+if HAS_ASYNCIO:
+    import asyncio
+
+    from .coroutines import delete_all, delete_in_atomic
+
+
+class AsyncParent(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+    name = models.CharField(max_length=100, unique=True)
+    value = models.IntegerField(default=0)
+
+
+class AsyncChild(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE
+
+    parent = models.ForeignKey(AsyncParent, on_delete=models.CASCADE)
+
+
+import pytest
+
+pytestmark = [
+    pytest.mark.django_db(transaction=True),
+    pytest.mark.skipif(not HAS_ASYNCIO, reason='requires Python 3.5+'),
+]
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@pytest.fixture()
+def parent():
+    parent = AsyncParent.objects.create(name='parent')
+    for _ in range(3):
+        AsyncChild.objects.create(parent=parent)
+    return parent
+
+
+def test_model_adelete_aundelete(parent):
+    assert run(parent.adelete()) == (4, {'safedelete.AsyncParent': 1, 'safedelete.AsyncChild': 3})
+    assert parent.deleted is not None
+    assert AsyncChild.objects.count() == 0
+
+    assert run(parent.aundelete()) == (4, {'safedelete.AsyncParent': 1, 'safedelete.AsyncChild': 3})
+    assert AsyncParent.objects.get().deleted is None
+    assert AsyncChild.objects.count() == 3
+
+
+def test_queryset_adelete_aundelete(parent):
+    threads = []
+
+    def receiver(sender, **kwargs):
+        threads.append(threading.current_thread())
+
+    pre_softdelete_batch.connect(receiver, sender=AsyncChild)
+    try:
+        with override_settings(SAFE_DELETE_BATCH_SIZE=2):
+            assert run(AsyncChild.objects.all().adelete()) == (3, {'safedelete.AsyncChild': 3})
+    finally:
+        pre_softdelete_batch.disconnect(receiver, sender=AsyncChild)
+    # Run by chunks, outside of the thread of the event loop
+    assert len(threads) == 2
+    assert threading.current_thread() not in threads
+    assert AsyncChild.objects.count() == 0
+
+    assert run(AsyncChild.deleted_objects.all().aundelete()) == (3, {'safedelete.AsyncChild': 3})
+    assert AsyncChild.objects.count() == 3
+
+
+def test_aupdate_or_create(parent):
+    parent.delete(force_policy=SOFT_DELETE)
+
+    obj, created = run(AsyncParent.objects.aupdate_or_create(name='parent', defaults={'value': 1}))
+    assert obj.pk == parent.pk
+    assert not created
+    assert AsyncParent.objects.get().value == 1
+
+    obj, created = run(AsyncParent.objects.aupdate_or_create(name='other'))
+    assert created
+
+
+def test_concurrent_operations(parent):
+    other = AsyncParent.objects.create(name='other')
+
+    assert [count for count, _ in run(delete_all(parent, other))] == [4, 1]
+    assert AsyncParent.objects.count() == 0
+
+
+def test_lazy(parent):
+    # Nothing is run until the coroutine is awaited
+    coroutine = parent.adelete()
+    assert asyncio.iscoroutine(coroutine)
+    coroutine.close()
+    assert AsyncParent.objects.count() == 1
+
+
+def test_caller_transaction(parent):
+    # The operation runs on the connection of the thread, it is not rolled back
+    with pytest.raises(ValueError):
+        run(delete_in_atomic(parent))
+    assert AsyncParent.objects.count() == 0
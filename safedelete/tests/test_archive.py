@@ -0,0 +1,153 @@
+import datetime
+
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import models
+from django.test import override_settings
+from django.utils import timezone
+from django.utils.six import StringIO
+
+from ..archive import archive_deleted, archive_model, get_archive_model, restore_archived
+from ..config import SOFT_DELETE_CASCADE
+from ..models import SafeDeleteModel
+
+
+class ArchivedAuthor(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+    name = models.CharField(max_length=100, unique=True)
+    updated = models.DateTimeField(auto_now=True)
+
+
+class ArchivedTag(models.Model):
+    name = models.CharField(max_length=100)
+
+
+class ArchivedBook(SafeDeleteModel):
+    author = models.ForeignKey(ArchivedAuthor, on_delete=models.CASCADE)
+    tags = models.ManyToManyField(ArchivedTag)
+
+
+class ArchivedNote(models.Model):
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.CharField(max_length=100)
+    content_object = GenericForeignKey()
+
+
+class ArchivedWithNotes(SafeDeleteModel):
+    notes = GenericRelation(ArchivedNote)
+
+
+class NotArchived(SafeDeleteModel):
+    pass
+
+
+ArchivedAuthorArchive = archive_model(ArchivedAuthor)
+ArchivedBookArchive = archive_model(ArchivedBook)
+ArchivedWithNotesArchive = archive_model(ArchivedWithNotes)
+
+
+import pytest
+pytestmark = pytest.mark.django_db
+
+
+def delete_author(name, days_ago, books=0):
+    author = ArchivedAuthor.objects.create(name=name)
+    for _ in range(books):
+        ArchivedBook.objects.create(author=author)
+    author.delete()
+    deleted = timezone.now() - datetime.timedelta(days=days_ago)
+    ArchivedAuthor.all_objects.filter(pk=author.pk).update(deleted=deleted)
+    ArchivedBook.all_objects.filter(author=author).update(deleted=deleted)
+    return author
+
+
+def test_archive_model():
+    assert get_archive_model(ArchivedAuthor) is ArchivedAuthorArchive
+    assert ArchivedAuthorArchive._meta.db_table == 'safedelete_archivedauthor_archive'
+    assert not ArchivedAuthorArchive._meta.get_field('name').unique
+    assert not ArchivedAuthorArchive._meta.get_field('updated').auto_now
+    assert not ArchivedBookArchive._meta.get_field('author').db_constraint
+    assert get_archive_model(NotArchived) is None
+
+    with pytest.raises(ImproperlyConfigured):
+        NotArchived.deleted_objects.archived()
+    with pytest.raises(ImproperlyConfigured):
+        archive_deleted(NotArchived)
+
+
+def test_archive_deleted():
+    old = delete_author('old', 100)
+    delete_author('recent', 10)
+    ArchivedAuthor.objects.create(name='alive')
+    updated = ArchivedAuthor.all_objects.get(pk=old.pk).updated
+
+    assert archive_deleted(ArchivedAuthor) == 1
+    assert ArchivedAuthor.all_objects.count() == 2
+    archived = ArchivedAuthor.deleted_objects.archived().get()
+    assert (archived.pk, archived.name, archived.updated) == (old.pk, 'old', updated)
+    assert archived.to_instance().deleted == archived.deleted
+
+    assert archive_deleted(ArchivedAuthor, older_than=datetime.timedelta(days=5)) == 1
+    assert ArchivedAuthor.all_objects.count() == 1
+
+
+def test_archive_deleted_dependents():
+    author = delete_author('author', 100, books=2)
+
+    # The author is kept until its books are archived
+    assert archive_deleted(ArchivedAuthor) == 0
+    assert archive_deleted(ArchivedBook) == 2
+    assert archive_deleted(ArchivedAuthor) == 1
+    assert ArchivedBookArchive.objects.filter(author_id=author.pk).count() == 2
+
+
+def test_archive_deleted_many_to_many():
+    author = delete_author('author', 100, books=1)
+    book = ArchivedBook.all_objects.get()
+    tag = ArchivedTag.objects.create(name='tag')
+    book.tags.add(tag)
+
+    # The links are deleted with the book
+    assert archive_deleted(ArchivedBook) == 1
+    assert not ArchivedBook.tags.through.objects.exists()
+    assert ArchivedTag.objects.get() == tag
+    assert archive_deleted(ArchivedAuthor) == 1
+    assert ArchivedBookArchive.objects.get().author_id == author.pk
+
+
+def test_archive_deleted_generic_relation():
+    with pytest.raises(ImproperlyConfigured):
+        archive_deleted(ArchivedWithNotes)
+
+
+def test_archive_deleted_batches(django_assert_num_queries):
+    for i in range(3):
+        delete_author('author %d' % i, 100)
+    # 2 batches: savepoint, select, insert, delete, release
+    with django_assert_num_queries(10):
+        assert archive_deleted(ArchivedAuthor, batch_size=2) == 3
+
+
+@override_settings(SAFE_DELETE_ARCHIVE_AGE=datetime.timedelta(days=200))
+def test_restore_archived():
+    author = delete_author('author', 300)
+    delete_author('recent', 100)
+    assert archive_deleted(ArchivedAuthor) == 1
+
+    assert restore_archived(ArchivedAuthor.deleted_objects.archived()) == 1
+    assert not ArchivedAuthorArchive.objects.exists()
+    restored = ArchivedAuthor.deleted_objects.get(pk=author.pk)
+    assert restored.deleted < timezone.now() - datetime.timedelta(days=200)
+
+
+def test_command():
+    delete_author('author', 100, books=1)
+    out = StringIO()
+    call_command('safedelete_archive', 'safedelete.ArchivedBook', 'safedelete.ArchivedAuthor', stdout=out)
+    assert out.getvalue().splitlines() == [
+        'safedelete.ArchivedBook: 1 object(s) archived.',
+        'safedelete.ArchivedAuthor: 1 object(s) archived.',
+    ]
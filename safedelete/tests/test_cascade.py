@@ -0,0 +1,114 @@
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import models, transaction
+from django.test import override_settings
+from django.utils.six import StringIO
+
+from ..cascade import (AbstractCascadeTask, BaseCascadeExecutor, CascadeTask,
+                       get_cascade_executor, run_cascade)
+from ..config import SOFT_DELETE, SOFT_DELETE_CASCADE
+from ..models import SafeDeleteModel
+
+
+class CascadeRoot(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+
+class CascadeLeaf(SafeDeleteModel):
+    root = models.ForeignKey(CascadeRoot, on_delete=models.CASCADE)
+
+
+class CascadeQueue(AbstractCascadeTask):
+    pass
+
+
+import pytest
+
+THREAD_POOL = 'safedelete.cascade.ThreadPoolCascadeExecutor'
+DATABASE = 'safedelete.cascade.DatabaseCascadeExecutor'
+
+
+@pytest.fixture()
+def root():
+    root = CascadeRoot.objects.create()
+    for _ in range(5):
+        CascadeLeaf.objects.create(root=root)
+    return root
+
+
+@pytest.mark.django_db
+def test_run_cascade(root):
+    # Only the root is deleted
+    root.delete(force_policy=SOFT_DELETE)
+    root.refresh_from_db()
+    task = CascadeTask(root._meta.label, root.pk, root.deleted, 'default')
+    progress = mock.Mock()
+
+    with override_settings(SAFE_DELETE_BATCH_SIZE=2):
+        assert run_cascade(task, progress=progress) == {'safedelete.CascadeLeaf': 5}
+    assert [call[0][1] for call in progress.call_args_list] == [2, 2, 1]
+    assert CascadeLeaf.objects.count() == 0
+
+    # Idempotent
+    assert run_cascade(task) == {}
+    # Skipped if the root was undeleted
+    root.undelete(force_policy=SOFT_DELETE)
+    CascadeLeaf.deleted_objects.all().undelete()
+    assert run_cascade(task) == {}
+    assert CascadeLeaf.objects.count() == 5
+
+
+@pytest.mark.django_db(transaction=True)
+@override_settings(SAFE_DELETE_CASCADE_EXECUTOR=THREAD_POOL)
+def test_thread_pool_executor(root):
+    executor = get_cascade_executor()
+    with transaction.atomic():
+        assert root.delete() == (1, {'safedelete.CascadeRoot': 1})
+        # The cascade starts once committed
+        assert CascadeLeaf.objects.count() == 5
+        assert executor._queue.qsize() == 0
+    executor.join()
+    assert CascadeLeaf.objects.count() == 0
+    assert executor.progress == {}
+    assert CascadeLeaf.deleted_objects.first().deleted == CascadeRoot.deleted_objects.get().deleted
+
+
+@pytest.mark.django_db
+@override_settings(SAFE_DELETE_CASCADE_EXECUTOR=DATABASE, SAFE_DELETE_CASCADE_QUEUE_MODEL='safedelete.CascadeQueue')
+def test_database_executor(root):
+    root.delete()
+    assert CascadeLeaf.objects.count() == 5
+    task = CascadeQueue.objects.get()
+    assert (task.model, task.to_task().pk, task.deleted) == ('safedelete.CascadeRoot', root.pk, root.deleted)
+
+    # Failed tasks are kept and retried
+    with mock.patch('safedelete.models.soft_delete_related', side_effect=ValueError):
+        assert get_cascade_executor().run_pending() == 0
+    task.refresh_from_db()
+    assert (task.attempts, task.finished) == (1, None)
+    assert 'ValueError' in task.error
+
+    out = StringIO()
+    with override_settings(SAFE_DELETE_BATCH_SIZE=2):
+        call_command('safedelete_cascade', stdout=out)
+    assert out.getvalue() == '1 cascade(s) run.\n'
+    task.refresh_from_db()
+    assert (task.attempts, task.processed, task.error) == (2, 5, '')
+    assert task.finished is not None
+    assert CascadeLeaf.objects.count() == 0
+
+    assert get_cascade_executor().run_pending() == 0
+
+
+@pytest.mark.django_db
+@override_settings(SAFE_DELETE_CASCADE_EXECUTOR=THREAD_POOL)
+def test_command_requires_database_executor():
+    with pytest.raises(CommandError):
+        call_command('safedelete_cascade')
+
+
+def test_base_executor():
+    with pytest.raises(NotImplementedError):
+        BaseCascadeExecutor().submit(None)
@@ -0,0 +1,107 @@
+from unittest import mock
+
+from django.db import models, transaction
+from django.test import override_settings
+
+from ..config import SOFT_DELETE_CASCADE
+from ..models import SafeDeleteModel
+from ..signals import post_softdelete, post_softdelete_batch, post_undelete_batch
+
+
+class DispatchParent(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+
+class DispatchChild(SafeDeleteModel):
+    parent = models.ForeignKey(DispatchParent, on_delete=models.CASCADE)
+
+
+import pytest
+# on_commit() callbacks are only run outside of the test transaction.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture()
+def receivers():
+    receivers = {signal: mock.Mock() for signal in (post_softdelete, post_softdelete_batch, post_undelete_batch)}
+    for signal, receiver in receivers.items():
+        # The per-instance signal is only received for the parents
+        signal.connect(receiver, sender=DispatchParent if signal is post_softdelete else None)
+    yield receivers
+    for signal, receiver in receivers.items():
+        signal.disconnect(receiver, sender=DispatchParent if signal is post_softdelete else None)
+
+
+def create_parents(count, children):
+    parents = [DispatchParent.objects.create() for _ in range(count)]
+    for parent in parents:
+        for _ in range(children):
+            DispatchChild.objects.create(parent=parent)
+    return parents
+
+
+def test_not_deferred(receivers):
+    parent, = create_parents(1, 2)
+    with transaction.atomic():
+        parent.delete()
+        assert receivers[post_softdelete].call_count == 1
+        assert receivers[post_softdelete_batch].call_count == 1
+
+
+@override_settings(SAFE_DELETE_DEFER_SIGNALS=True)
+def test_deferred(receivers):
+    parents = create_parents(2, 2)
+    with transaction.atomic():
+        for parent in parents:
+            parent.delete()
+        assert receivers[post_softdelete].call_count == 0
+        assert receivers[post_softdelete_batch].call_count == 0
+
+    assert [call[1]['instance'] for call in receivers[post_softdelete].call_args_list] == parents
+    # Each cascade has its own deletion datetime
+    assert receivers[post_softdelete_batch].call_count == 2
+
+    with transaction.atomic():
+        for child in DispatchChild.deleted_objects.all():
+            DispatchChild.deleted_objects.filter(pk=child.pk).undelete()
+    # The batches of the same model and datetime are coalesced
+    assert receivers[post_undelete_batch].call_count == 1
+    assert sorted(receivers[post_undelete_batch].call_args[1]['pks']) == sorted(
+        DispatchChild.objects.values_list('pk', flat=True)
+    )
+
+
+@override_settings(SAFE_DELETE_DEFER_SIGNALS=True)
+def test_deferred_autocommit(receivers):
+    parent, = create_parents(1, 1)
+    parent.delete()
+    assert receivers[post_softdelete].call_count == 1
+    assert receivers[post_softdelete_batch].call_count == 1
+
+
+@override_settings(SAFE_DELETE_DEFER_SIGNALS=True)
+def test_deferred_rollback(receivers):
+    parents = create_parents(3, 1)
+
+    with pytest.raises(ValueError):
+        with transaction.atomic():
+            parents[0].delete()
+            raise ValueError()
+    assert receivers[post_softdelete].call_count == 0
+
+    with transaction.atomic():
+        parents[0].delete()
+        try:
+            with transaction.atomic():
+                parents[1].delete()
+                raise ValueError()
+        except ValueError:
+            pass
+        # Queued in a new savepoint, after the rolled back one
+        with transaction.atomic():
+            parents[2].delete()
+
+    assert [call[1]['instance'] for call in receivers[post_softdelete].call_args_list] == [
+        parents[0], parents[2],
+    ]
+    assert receivers[post_softdelete_batch].call_count == 2
@@ -0,0 +1,56 @@
+from django.core.management import call_command
+from django.db import connection, models
+from django.utils.six import StringIO
+
+from ..indexes import check_visible_indexes, is_visible_index, visible_index
+from ..models import SafeDeleteModel
+
+
+class IndexedArticle(SafeDeleteModel):
+    slug = models.CharField(max_length=50)
+
+    class Meta:
+        indexes = [
+            visible_index(['slug'], 'indexed_article_visible_idx'),
+            models.Index(fields=['slug'], name='indexed_article_slug_idx'),
+        ]
+
+
+class NotIndexedArticle(SafeDeleteModel):
+    slug = models.CharField(max_length=50)
+
+
+import pytest
+pytestmark = pytest.mark.django_db
+
+
+def test_visible_index():
+    index = visible_index(['slug'], 'visible_idx')
+    assert is_visible_index(index)
+    assert not is_visible_index(models.Index(fields=['slug'], name='slug_idx'))
+
+    # The index condition matches the visibility filter of the default manager.
+    queryset = IndexedArticle.objects.filter(slug='a')
+    queryset._filter_visibility()
+    assert '"deleted" IS NULL' in str(queryset.query)
+
+
+def test_check_visible_indexes():
+    assert check_visible_indexes(IndexedArticle, connection) == []
+    assert len(check_visible_indexes(NotIndexedArticle, connection)) == 1
+
+
+def test_check_visible_indexes_missing(monkeypatch):
+    monkeypatch.setattr(IndexedArticle._meta, 'indexes', [visible_index(['slug'], 'not_migrated_idx')])
+    assert check_visible_indexes(IndexedArticle, connection) == [
+        'index not_migrated_idx is missing from the database, run migrate',
+    ]
+
+
+def test_command():
+    out = StringIO()
+    call_command('safedelete_indexes', 'safedelete', stdout=out)
+    output = out.getvalue()
+    assert 'safedelete.NotIndexedArticle: no visible_index() declared' in output
+    assert 'safedelete.IndexedArticle' not in output
+    assert 'problem(s) found.' in output
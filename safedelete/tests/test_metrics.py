@@ -0,0 +1,98 @@
+from django.db import models
+from django.test import override_settings
+
+from ..config import SOFT_DELETE_CASCADE
+from ..metrics import collect_stats, get_backend
+from ..models import SafeDeleteModel
+from ..utils import related_objects, related_pks
+
+
+class MetricsAuthor(SafeDeleteModel):
+    _safedelete_policy = SOFT_DELETE_CASCADE
+
+
+class MetricsBook(SafeDeleteModel):
+    author = models.ForeignKey(MetricsAuthor, on_delete=models.CASCADE)
+
+
+import pytest
+pytestmark = pytest.mark.django_db
+
+
+class RecordingBackend(object):
+    records = []
+
+    def record(self, stats):
+        self.records.append(stats)
+
+
+@pytest.fixture()
+def author():
+    author = MetricsAuthor.objects.create()
+    for _ in range(3):
+        MetricsBook.objects.create(author=author)
+    return author
+
+
+def test_model_delete_stats(author):
+    with collect_stats() as stats:
+        author.delete()
+
+    totals = stats.totals()
+    assert totals['model.delete']['count'] == 1
+    assert totals['model.delete']['rows'] == 4
+    assert totals['model.delete']['queries'] > 0
+    assert totals['model.delete']['elapsed'] > 0
+    # The cascade walk is reported on its own, and counted in model.delete.
+    assert totals['related_pks']['collected'] == 3
+    assert totals['related_pks']['queries'] < totals['model.delete']['queries']
+
+
+def test_model_undelete_stats(author):
+    author.delete()
+    with collect_stats() as stats:
+        assert author.undelete() == (4, {'safedelete.MetricsAuthor': 1, 'safedelete.MetricsBook': 3})
+
+    assert stats.totals()['model.undelete']['rows'] == 4
+
+
+def test_queryset_stats(author):
+    with collect_stats() as stats:
+        MetricsBook.objects.all().delete()
+        assert MetricsBook.deleted_objects.all().undelete() == (3, {'safedelete.MetricsBook': 3})
+
+    delete, undelete = stats.operations
+    assert (delete.operation, delete.model, delete.rows) == ('queryset.delete', MetricsBook, 3)
+    assert (undelete.operation, undelete.model, undelete.rows) == ('queryset.undelete', MetricsBook, 3)
+
+
+def test_related_objects_stats(author):
+    with collect_stats() as stats:
+        assert len(list(related_objects(author))) == 3
+        assert len(list(related_pks(author))) == 3
+
+    assert stats.totals()['related_objects']['collected'] == 3
+    assert stats.totals()['related_pks']['collected'] == 3
+
+
+def test_nested_collectors(author):
+    with collect_stats() as outer:
+        with collect_stats() as inner:
+            author.delete()
+        author.undelete()
+
+    assert len(inner.operations) == 2
+    assert len(outer.operations) == 4
+
+
+@override_settings(SAFE_DELETE_METRICS_BACKEND='safedelete.tests.test_metrics.RecordingBackend')
+def test_backend(author):
+    RecordingBackend.records = []
+    author.delete()
+    assert isinstance(get_backend(), RecordingBackend)
+    assert [stats.operation for stats in RecordingBackend.records] == ['related_pks', 'model.delete']
+
+
+def test_disabled(author):
+    # Without backend nor collector, the generators are not wrapped.
+    assert related_pks(author).__name__ == '_walk_related_pks'
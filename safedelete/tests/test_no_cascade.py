@@ -4,6 +4,7 @@ from django.db.models.deletion import ProtectedError
 from safedelete.tests.asserts import assert_soft_delete, assert_hard_delete
 from ..config import HARD_DELETE_NOCASCADE
 from ..models import SafeDeleteModel
+from ..utils import can_hard_delete
 
 
 class NoCascadeModel(SafeDeleteModel):
@@ -69,6 +70,33 @@ def test_cascade(instance):
     cascade_child.delete()
     assert_hard_delete(instance)
 
+def test_can_hard_delete_stops_at_first_row(instance, django_assert_num_queries):
+    for i in range(3):
+        CascadeChild.objects.create(parent=instance)
+    NullChild.objects.create(parent=instance)
+
+    # Only the CASCADE relation is probed
+    with django_assert_num_queries(1):
+        assert not can_hard_delete(instance)
+
+    CascadeChild.objects.all().delete()
+    with django_assert_num_queries(1):
+        assert can_hard_delete(instance)
+
+def test_queryset_delete(instance):
+    CascadeChild.objects.create(parent=instance)
+    null_child = NullChild.objects.create(parent=NoCascadeModel.objects.create())
+    NoCascadeModel.objects.create()
+
+    count, per_model = NoCascadeModel.objects.all().delete()
+    assert count == 3
+    assert per_model['safedelete.NoCascadeModel'] == 3
+    # The object with a cascade child is only masked
+    assert list(NoCascadeModel.all_objects.all()) == [instance]
+    assert NoCascadeModel.objects.count() == 0
+    null_child.refresh_from_db()
+    assert null_child.parent is None
+
 def test_protected(instance):
     ProtectedChild.objects.create(
         parent=instance
@@ -0,0 +1,122 @@
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, models
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..config import HARD_DELETE_NOCASCADE
+from ..models import SafeDeleteModel
+from ..utils import (can_hard_delete, iter_related_objects, related_objects,
+                     related_pks)
+
+
+class RelatedTag(models.Model):
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+
+
+class RelatedParent(SafeDeleteModel):
+    tags = GenericRelation(RelatedTag)
+
+
+class RelatedInherited(RelatedParent):
+    pass
+
+
+class RelatedCascade(SafeDeleteModel):
+    parent = models.ForeignKey(RelatedParent, on_delete=models.CASCADE)
+
+
+class RelatedCascadeChild(models.Model):
+    cascade = models.ForeignKey(RelatedCascade, on_delete=models.CASCADE)
+
+
+class RelatedSetNull(models.Model):
+    parent = models.ForeignKey(RelatedParent, on_delete=models.SET_NULL, null=True)
+
+
+import pytest
+pytestmark = pytest.mark.django_db
+
+
+def _related_objects_pairs(obj):
+    return {(related.__class__, related.pk) for related in related_objects(obj)}
+
+
+@pytest.fixture()
+def parent():
+    parent = RelatedParent.objects.create()
+    cascade = RelatedCascade.objects.create(parent=parent)
+    RelatedCascadeChild.objects.create(cascade=cascade)
+    RelatedCascadeChild.objects.create(cascade=cascade)
+    RelatedSetNull.objects.create(parent=parent)
+    RelatedTag.objects.create(content_object=parent)
+    return parent
+
+
+def test_related_pks(parent):
+    pairs = set(related_pks(parent))
+    assert len(pairs) == 4
+    assert pairs == _related_objects_pairs(parent)
+
+
+def test_related_pks_inherited():
+    inherited = RelatedInherited.objects.create()
+    RelatedCascade.objects.create(parent=inherited)
+
+    pairs = set(related_pks(inherited))
+    assert (RelatedParent, inherited.pk) in pairs
+    assert pairs == _related_objects_pairs(inherited)
+
+
+def test_related_pks_nothing_related():
+    assert list(related_pks(RelatedParent.objects.create())) == []
+
+
+@override_settings(SAFE_DELETE_BATCH_SIZE=1)
+def test_related_pks_paginated(parent):
+    RelatedCascade.objects.create(parent=parent)
+
+    with CaptureQueriesContext(connection) as queries:
+        pairs = list(related_pks(parent))
+    assert len(pairs) == 5
+    assert set(pairs) == _related_objects_pairs(parent)
+    # Each relation is read by pages of one row, until an empty page
+    cascade_queries = [q for q in queries.captured_queries
+                       if 'FROM "safedelete_relatedcascade"' in q['sql']]
+    assert len(cascade_queries) == 3
+
+
+@override_settings(SAFE_DELETE_BATCH_SIZE=2)
+def test_iter_related_objects(parent):
+    RelatedCascade.objects.create(parent=parent)
+
+    related = list(iter_related_objects(parent))
+    assert len(related) == 5
+    assert {(obj.__class__, obj.pk) for obj in related} == _related_objects_pairs(parent)
+
+
+def test_can_hard_delete():
+    parent = RelatedParent.objects.create()
+    assert can_hard_delete(parent)
+
+    RelatedTag.objects.create(content_object=parent)
+    assert not can_hard_delete(parent)
+
+    # The parent of a multi-table inherited model would be deleted with it
+    assert not can_hard_delete(RelatedInherited.objects.create())
+
+
+def test_queryset_delete_hard_delete_nocascade(parent):
+    inherited = RelatedInherited.objects.create()
+    alone = RelatedParent.objects.create()
+
+    RelatedParent.objects.all().delete(force_policy=HARD_DELETE_NOCASCADE)
+    assert RelatedParent.objects.count() == 0
+    # Only the object without dependents is hard deleted
+    assert set(RelatedParent.all_objects.all()) == {parent, RelatedParent.all_objects.get(pk=inherited.pk)}
+    assert not RelatedParent.all_objects.filter(pk=alone.pk).exists()
+
+    RelatedInherited.all_objects.all().delete(force_policy=HARD_DELETE_NOCASCADE)
+    assert RelatedInherited.all_objects.get().deleted
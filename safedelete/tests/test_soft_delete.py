@@ -1,14 +1,19 @@
 from safedelete.tests.asserts import assert_soft_delete
 
+from contextlib import contextmanager
 from unittest import mock
 
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import connection, models, router
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.text import slugify
 
 from ..models import SafeDeleteMixin
-from ..models import SafeDeleteModel
-from ..config import SOFT_DELETE_CASCADE
+from ..models import SafeDeleteMeta, SafeDeleteModel, get_safedelete_meta
+from ..config import HARD_DELETE, SOFT_DELETE, SOFT_DELETE_CASCADE
+from ..signals import (post_softdelete, post_softdelete_batch, post_undelete,
+                       post_undelete_batch, pre_softdelete, pre_softdelete_batch)
 
 
 class SoftDeleteModel(SafeDeleteModel):
@@ -32,6 +37,26 @@ class UniqueSoftDeleteModel(SafeDeleteModel):
         unique=True
     )
 
+
+class SlugSoftDeleteModel(SafeDeleteModel):
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(unique=True)
+
+    def save(self, *args, **kwargs):
+        self.slug = slugify(self.name)
+        super(SlugSoftDeleteModel, self).save(*args, **kwargs)
+
+
+class MultiUniqueSoftDeleteModel(SafeDeleteModel):
+    code = models.CharField(max_length=100, unique=True)
+    slug = models.CharField(max_length=100, unique=True)
+    first_name = models.CharField(max_length=100)
+    last_name = models.CharField(max_length=100)
+    notes = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        unique_together = [('first_name', 'last_name')]
+
 import pytest
 pytestmark = pytest.mark.django_db
 
@@ -40,6 +65,17 @@ def instance():
     return SoftDeleteModel.objects.create( )
 
 
+@contextmanager
+def connected(signal, sender=SoftDeleteModel):
+    """Connect a mock receiver to ``signal`` within the block."""
+    receiver = mock.Mock()
+    signal.connect(receiver, sender=sender)
+    try:
+        yield receiver
+    finally:
+        signal.disconnect(receiver, sender=sender)
+
+
 def test_softdelete(instance):
     """Deleting a model with the soft delete policy should only mask it, not delete it."""
     assert_soft_delete(instance)
@@ -50,11 +86,30 @@ def test_softdelete_mixin():
     assert_soft_delete(SoftDeleteMixinModel.objects.create())
 
 
+def test_signals_without_receivers(instance, django_assert_num_queries):
+    """Without receivers, the signals are not sent and the database router is not used."""
+    db_for_write = router.db_for_write
+    with mock.patch.object(router, 'db_for_write', wraps=db_for_write) as mock_router:
+        with mock.patch('safedelete.models.pre_softdelete.send') as mock_presoftdelete:
+            instance.delete()
+            instance.save()
+    # Only Model.save_base() uses the router
+    assert mock_router.call_count == 2
+    assert mock_presoftdelete.call_count == 0
+
+    SoftDeleteModel.objects.create()
+    # A single query, without reading the objects
+    with django_assert_num_queries(1):
+        SoftDeleteModel.objects.all().delete()
+    with django_assert_num_queries(1):
+        SoftDeleteModel.all_objects.all().undelete()
+
+
 def test_signals(instance):
     """The soft delete and undelete signals should be sent correctly for soft deleted models."""
-    with mock.patch('safedelete.models.post_undelete.send') as mock_undelete:
-      with mock.patch('safedelete.models.post_softdelete.send') as mock_softdelete:
-        with mock.patch('safedelete.models.pre_softdelete.send') as mock_presoftdelete:
+    with connected(post_undelete) as mock_undelete:
+      with connected(post_softdelete) as mock_softdelete:
+        with connected(pre_softdelete) as mock_presoftdelete:
           instance.delete()
           # Soft deleting the model should've sent a pre_softdelete and a post_softdelete signals.
           assert  mock_presoftdelete.call_count == 1
@@ -91,20 +146,53 @@ def test_undelete_queryset(instance):
 
 def test_undelete_with_soft_delete_policy_and_forced_soft_delete_cascade_policy(instance):
     assert SoftDeleteModel.objects.count() == 1
-    SoftDeleteRelatedModel.objects.create(related=SoftDeleteModel.objects.first())
+    SoftDeleteRelatedModel.objects.create(related=instance)
+    SoftDeleteRelatedModel.objects.create(related=instance).delete()
     assert SoftDeleteRelatedModel.objects.count() == 1
 
-    SoftDeleteModel.objects.all().delete()
+    instance.delete(force_policy=SOFT_DELETE_CASCADE)
     assert SoftDeleteModel.objects.count() == 0
-
-    SoftDeleteRelatedModel.objects.all().delete()
     assert SoftDeleteRelatedModel.objects.count() == 0
 
     SoftDeleteModel.deleted_objects.all().undelete(force_policy=SOFT_DELETE_CASCADE)
     assert SoftDeleteModel.objects.count() == 1
+    # Only the related object deleted in the same cascade is undeleted
     assert SoftDeleteRelatedModel.objects.count() == 1
 
 
+def test_softdelete_only_writes_deleted():
+    """Soft deleting and undeleting an object only write its deleted field"""
+    obj = UniqueSoftDeleteModel.objects.create(name='saved')
+    obj.name = 'changed'
+    with CaptureQueriesContext(connection) as ctx:
+        obj.delete()
+    update, = [query['sql'] for query in ctx.captured_queries if query['sql'].startswith('UPDATE')]
+    assert '"deleted"' in update and '"name"' not in update
+
+    with CaptureQueriesContext(connection) as ctx:
+        obj.undelete()
+    update, = [query['sql'] for query in ctx.captured_queries if query['sql'].startswith('UPDATE')]
+    assert '"deleted"' in update and '"name"' not in update
+
+    obj.delete(update_fields=['name'])
+    obj = UniqueSoftDeleteModel.deleted_objects.get()
+    assert obj.name == 'changed'
+
+
+def test_softdelete_saves_pre_softdelete_changes():
+    """The changes made by the pre_softdelete receivers are saved"""
+    def receiver(instance, **kwargs):
+        instance.name = 'deleted by receiver'
+
+    obj = UniqueSoftDeleteModel.objects.create(name='saved')
+    pre_softdelete.connect(receiver, sender=UniqueSoftDeleteModel)
+    try:
+        obj.delete()
+    finally:
+        pre_softdelete.disconnect(receiver, sender=UniqueSoftDeleteModel)
+    assert UniqueSoftDeleteModel.deleted_objects.get().name == 'deleted by receiver'
+
+
 def test_validate_unique(instance):
     """Check that uniqueness is also checked against deleted objects """
     UniqueSoftDeleteModel.objects.create(
@@ -116,12 +204,114 @@ def test_validate_unique(instance):
     )
 
 
+def test_validate_unique_single_query(django_assert_num_queries):
+    """All the unique checks are done with one query, and only the constraints that fired are reported"""
+    MultiUniqueSoftDeleteModel.objects.create(
+        code='code', slug='slug', first_name='John', last_name='Doe'
+    ).delete()
+    MultiUniqueSoftDeleteModel.objects.create(
+        code='other', slug='other', first_name='Jane', last_name='Doe'
+    )
+
+    with django_assert_num_queries(1):
+        with pytest.raises(ValidationError) as excinfo:
+            MultiUniqueSoftDeleteModel(
+                code='code', slug='new', first_name='Jane', last_name='Doe'
+            ).validate_unique()
+    assert set(excinfo.value.message_dict) == {'code', '__all__'}
+
+    with django_assert_num_queries(1):
+        MultiUniqueSoftDeleteModel(
+            code='new', slug='new', first_name='John', last_name='Smith'
+        ).validate_unique()
+
+
+def test_validate_unique_excludes_self():
+    obj = MultiUniqueSoftDeleteModel.objects.create(
+        code='code', slug='slug', first_name='John', last_name='Doe'
+    )
+    obj.delete()
+    obj.validate_unique()
+
+
+def test_bulk_validate_unique(django_assert_num_queries):
+    MultiUniqueSoftDeleteModel.objects.create(
+        code='code', slug='slug', first_name='John', last_name='Doe'
+    ).delete()
+    instances = [
+        # Conflicts with the deleted object
+        MultiUniqueSoftDeleteModel(code='code', slug='a', first_name='John', last_name='Doe'),
+        MultiUniqueSoftDeleteModel(code='b', slug='b', first_name='Jane', last_name='Doe'),
+        # Conflicts with the previous instance
+        MultiUniqueSoftDeleteModel(code='c', slug='b', first_name='Jack', last_name='Doe'),
+    ]
+
+    # One query per constraint: code, slug and (first_name, last_name), id is not set
+    with django_assert_num_queries(3):
+        errors = MultiUniqueSoftDeleteModel.bulk_validate_unique(instances)
+    assert set(errors) == {0, 2}
+    assert set(errors[0]) == {'code', '__all__'}
+    assert set(errors[2]) == {'slug'}
+
+    # Same errors as validate_unique() against the existing objects
+    with pytest.raises(ValidationError) as excinfo:
+        instances[0].validate_unique()
+    assert excinfo.value.message_dict == ValidationError(errors[0]).message_dict
+
+
+def test_bulk_validate_unique_excludes_self():
+    obj = MultiUniqueSoftDeleteModel.objects.create(
+        code='code', slug='slug', first_name='John', last_name='Doe'
+    )
+    assert MultiUniqueSoftDeleteModel.bulk_validate_unique([obj]) == {}
+    assert MultiUniqueSoftDeleteModel.bulk_validate_unique([], exclude=['code']) == {}
+
+    other = MultiUniqueSoftDeleteModel(code='code', slug='slug', first_name='John', last_name='Doe')
+    errors = MultiUniqueSoftDeleteModel.bulk_validate_unique([other], exclude=['code'])
+    assert set(errors[0]) == {'slug', '__all__'}
+
+
+@override_settings(SAFE_DELETE_BATCH_SIZE=1)
+def test_bulk_validate_unique_batches(django_assert_num_queries):
+    instances = [UniqueSoftDeleteModel(name=name) for name in ('a', 'b', 'a')]
+    UniqueSoftDeleteModel.objects.create(name='b')
+
+    # One query per instance not conflicting with a previous one
+    with django_assert_num_queries(2):
+        errors = UniqueSoftDeleteModel.bulk_validate_unique(instances)
+    assert set(errors) == {1, 2}
+
+
 def test_check_unique_fields_exists(instance):
     # No unique fields
     assert SoftDeleteModel.has_unique_fields() == False
     assert UniqueSoftDeleteModel.has_unique_fields() == True
 
 
+def test_update_or_create_revives_unique_filled_in_save():
+    deleted = SlugSoftDeleteModel.objects.create(name='Foo')
+    deleted.delete()
+
+    # The lookup has no unique field, but save() would create the same slug
+    obj, created = SlugSoftDeleteModel.objects.update_or_create(name='Foo')
+    assert obj.pk == deleted.pk
+    assert not created
+    assert SlugSoftDeleteModel.objects.get().slug == 'foo'
+
+
+def test_update_or_create_revives_with_defaults():
+    deleted = MultiUniqueSoftDeleteModel.objects.create(code='a', slug='a', notes='old')
+    deleted.delete()
+
+    # The created object would conflict with the deleted one on code
+    obj, created = MultiUniqueSoftDeleteModel.objects.update_or_create(
+        notes='old', defaults={'code': 'a', 'notes': 'new'},
+    )
+    assert obj.pk == deleted.pk
+    assert not created
+    assert MultiUniqueSoftDeleteModel.objects.get().notes == 'new'
+
+
 def test_update_or_create_no_unique_field(instance):
     SoftDeleteModel.objects.update_or_create(id=1)
     obj, created = SoftDeleteModel.objects.update_or_create(id=1)
@@ -138,6 +328,61 @@ def test_update_or_create_with_unique_field(instance):
     assert created == False
 
 
+def test_bulk_update_or_create(django_assert_num_queries):
+    deleted = MultiUniqueSoftDeleteModel.objects.create(code='deleted', slug='deleted-old', first_name='old')
+    deleted.delete()
+    existing = MultiUniqueSoftDeleteModel.objects.create(code='existing', slug='existing-old')
+
+    objs = [
+        MultiUniqueSoftDeleteModel(code=code, slug=code, first_name=code)
+        for code in ('deleted', 'existing', 'new')
+    ]
+    with connected(post_undelete, sender=MultiUniqueSoftDeleteModel) as mock_undelete:
+        # Select, revive, bulk update and bulk create (within a savepoint)
+        with django_assert_num_queries(6):
+            result = MultiUniqueSoftDeleteModel.objects.bulk_update_or_create(
+                objs, ['code'], update_fields=['slug'],
+            )
+    assert mock_undelete.call_count == 1
+    assert result.revived == [objs[0]]
+    assert result.updated == [objs[1]]
+    assert result.created == [objs[2]]
+    assert objs[0].pk == deleted.pk
+    assert objs[1].pk == existing.pk
+
+    assert MultiUniqueSoftDeleteModel.objects.count() == 3
+    assert dict(MultiUniqueSoftDeleteModel.objects.values_list('code', 'slug')) == {
+        'deleted': 'deleted', 'existing': 'existing', 'new': 'new',
+    }
+    # Only the update_fields are written on the existing rows
+    assert MultiUniqueSoftDeleteModel.objects.get(pk=deleted.pk).first_name == 'old'
+
+
+def test_bulk_update_or_create_hard_delete_policy():
+    UniqueSoftDeleteModel.objects.create(name='a').delete(force_policy=SOFT_DELETE)
+    with mock.patch.object(UniqueSoftDeleteModel, '_safedelete_policy', HARD_DELETE):
+        result = UniqueSoftDeleteModel.objects.bulk_update_or_create(
+            [UniqueSoftDeleteModel(name='b')], ['name'],
+        )
+    assert len(result.created) == 1
+    assert UniqueSoftDeleteModel.objects.count() == 1
+
+
+@override_settings(SAFE_DELETE_BATCH_SIZE=1)
+def test_bulk_update_or_create_batches():
+    UniqueSoftDeleteModel.objects.create(name='a').delete()
+    result = UniqueSoftDeleteModel.objects.bulk_update_or_create(
+        [UniqueSoftDeleteModel(name=name) for name in ('a', 'b', 'c')], ['name'],
+    )
+    assert (len(result.created), len(result.revived), len(result.updated)) == (2, 1, 0)
+    assert UniqueSoftDeleteModel.objects.count() == 3
+
+    with pytest.raises(ValueError):
+        UniqueSoftDeleteModel.objects.bulk_update_or_create(
+            [UniqueSoftDeleteModel(name='d'), UniqueSoftDeleteModel(name='d')], ['name'],
+        )
+
+
 @override_settings(SAFE_DELETE_INTERPRET_UNDELETED_OBJECTS_AS_CREATED=True)
 def test_update_or_create_flag_with_settings_flag_active():
     # Create and soft-delete object
@@ -148,3 +393,91 @@ def test_update_or_create_flag_with_settings_flag_active():
     assert obj.name == 'unique-test'
     # Settings flag is active so the revived object should be interpreted as created
     assert created == True
+
+
+def test_delete_queryset_bulk(django_assert_num_queries):
+    SoftDeleteModel.objects.create()
+    SoftDeleteModel.objects.create()
+
+    with django_assert_num_queries(1):
+        deleted = SoftDeleteModel.objects.all().delete(send_signals=False)
+    assert deleted == (2, {'safedelete.SoftDeleteModel': 2})
+    assert SoftDeleteModel.objects.count() == 0
+    assert SoftDeleteModel.all_objects.count() == 2
+
+
+@override_settings(SAFE_DELETE_BATCH_SIZE=2)
+def test_delete_queryset_bulk_signals(instance):
+    SoftDeleteModel.objects.create()
+    SoftDeleteModel.objects.create()
+
+    with connected(post_softdelete) as mock_softdelete:
+        with connected(pre_softdelete) as mock_presoftdelete:
+            SoftDeleteModel.objects.all().delete()
+            assert mock_presoftdelete.call_count == 3
+            assert mock_softdelete.call_count == 3
+            assert mock_softdelete.call_args[1]['instance'].deleted
+    assert SoftDeleteModel.objects.count() == 0
+    assert SoftDeleteModel.all_objects.count() == 3
+
+
+@override_settings(SAFE_DELETE_BATCH_SIZE=2)
+def test_delete_queryset_batch_signals(instance, django_assert_num_queries):
+    SoftDeleteModel.objects.create()
+    SoftDeleteModel.objects.create()
+    pks = list(SoftDeleteModel.objects.order_by('pk').values_list('pk', flat=True))
+
+    with connected(post_softdelete_batch) as mock_post_batch:
+        with connected(pre_softdelete_batch) as mock_pre_batch:
+            # Without per-instance receivers, only the primary keys are read: 2 pages and 2 updates
+            with django_assert_num_queries(4):
+                SoftDeleteModel.objects.all().delete()
+    assert mock_pre_batch.call_count == 2
+    assert [call[1]['pks'] for call in mock_post_batch.call_args_list] == [pks[:2], pks[2:]]
+    kwargs = mock_post_batch.call_args[1]
+    assert kwargs['sender'] is SoftDeleteModel
+    assert kwargs['using'] == 'default'
+    assert kwargs['deleted'] == SoftDeleteModel.deleted_objects.get(pk=pks[2]).deleted
+
+    with connected(post_undelete_batch) as mock_undelete_batch:
+        SoftDeleteModel.deleted_objects.all().undelete()
+    assert mock_undelete_batch.call_count == 2
+    assert 'deleted' not in mock_undelete_batch.call_args[1]
+
+
+def test_undelete_queryset_bulk(django_assert_num_queries):
+    SoftDeleteModel.objects.create().delete()
+    SoftDeleteModel.objects.create().delete()
+    SoftDeleteModel.objects.create()
+
+    with django_assert_num_queries(1):
+        SoftDeleteModel.all_objects.all().undelete(send_signals=False)
+    assert SoftDeleteModel.objects.count() == 3
+
+
+@override_settings(SAFE_DELETE_BATCH_SIZE=1)
+def test_undelete_queryset_bulk_signals(instance):
+    instance.delete()
+    SoftDeleteModel.objects.create().delete()
+    SoftDeleteModel.objects.create()
+
+    with connected(post_undelete) as mock_undelete:
+        SoftDeleteModel.all_objects.all().undelete()
+        # Only the soft deleted objects are undeleted
+        assert mock_undelete.call_count == 2
+        assert mock_undelete.call_args[1]['instance'].deleted is None
+    assert SoftDeleteModel.objects.count() == 3
+
+
+def test_safedelete_meta():
+    assert get_safedelete_meta(SoftDeleteModel) == SafeDeleteMeta(
+        is_safedelete=True,
+        has_unique_fields=False,
+        unique_fields=frozenset([frozenset(['id'])]),
+    )
+    assert get_safedelete_meta(models.Model) == SafeDeleteMeta(False, None, None)
+    assert get_safedelete_meta(MultiUniqueSoftDeleteModel).unique_fields == frozenset([
+        frozenset(['id']), frozenset(['code']), frozenset(['slug']), frozenset(['first_name', 'last_name']),
+    ])
+    # Classes not prepared yet are registered on access
+    assert not get_safedelete_meta(type('NotAModel', (object,), {})).is_safedelete
@@ -1,9 +1,12 @@
-from django.db import models
+from django.db import connection, models
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from safedelete import SOFT_DELETE_CASCADE, SOFT_DELETE
 from safedelete.models import SafeDeleteModel
+from safedelete.signals import post_softdelete_batch, pre_softdelete
 from safedelete.tests.models import Article, Author, Category
 
-from unittest.mock import patch
+from unittest.mock import Mock
 import pytest
 pytestmark = pytest.mark.django_db
 
@@ -102,17 +105,76 @@ def test_soft_delete_cascade_deleted(authors,categories,articles,press):
     articles[0].delete(force_policy=SOFT_DELETE)
     assert authors[1].article_set.count() ==  1
 
-    with patch('safedelete.tests.models.Article.delete') as delete_article_mock:
+    pre_softdelete_mock = Mock()
+    pre_softdelete.connect(pre_softdelete_mock)
+    try:
         authors[1].delete(force_policy=SOFT_DELETE_CASCADE)
-        # delete_article_mock.assert_called_once doesn't work on py35
-        assert delete_article_mock.call_count ==  1
+    finally:
+        pre_softdelete.disconnect(pre_softdelete_mock)
+    # The already soft-deleted article is left untouched
+    assert pre_softdelete_mock.call_count ==  2
+    assert Article.all_objects.get(pk=articles[0].pk).deleted == articles[0].deleted
+    assert Article.all_objects.get(pk=articles[1].pk).deleted == authors[1].deleted
+
+
+def test_soft_delete_cascade_batch_signals(authors,categories,articles,press):
+    receiver = Mock()
+    post_softdelete_batch.connect(receiver)
+    try:
+        authors[2].delete(force_policy=SOFT_DELETE_CASCADE)
+    finally:
+        post_softdelete_batch.disconnect(receiver)
+    # One signal per related model, the author itself is deleted on its own
+    sent = {call[1]['sender']: call[1]['pks'] for call in receiver.call_args_list}
+    assert sent == {
+        Article: [articles[2].pk],
+        Press: [press.pk],
+    }
+    assert receiver.call_args[1]['deleted'] == Author.all_objects.get(pk=authors[2].pk).deleted
+
+
+def test_soft_delete_cascade_counts(authors,categories,articles,press):
+    Article.objects.create(author=authors[2])
+
+    with CaptureQueriesContext(connection) as queries:
+        count, per_model = authors[2].delete(force_policy=SOFT_DELETE_CASCADE)
+    # One update per model
+    updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+    assert len(updates) == 3
+
+    assert count == 4
+    assert per_model == {
+        'safedelete.Author': 1,
+        'safedelete.Article': 2,
+        'safedelete.Press': 1,
+    }
+    assert Article.objects.filter(author=authors[2]).count() == 0
 
 
 def test_undelete_with_soft_delete_cascade_policy(authors,categories,articles,press):
     authors[2].delete(force_policy=SOFT_DELETE_CASCADE)
-    authors[2].undelete(force_policy=SOFT_DELETE_CASCADE)
+    with CaptureQueriesContext(connection) as queries:
+        authors[2].undelete(force_policy=SOFT_DELETE_CASCADE)
+    # The author, then one update per related model
+    updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+    assert len(updates) == 3
 
     assert Author.objects.count() ==  3
     assert Article.objects.count() ==  3
     assert Category.objects.count() ==  3
     assert Press.objects.count() ==  1
+
+
+def test_undelete_only_same_cascade(authors,categories,articles,press):
+    # Deleted separately, e.g. by the cascades of safedelete < 0.5.2
+    articles[2].delete(force_policy=SOFT_DELETE)
+    authors[2].delete(force_policy=SOFT_DELETE_CASCADE)
+
+    authors[2].undelete(force_policy=SOFT_DELETE_CASCADE)
+    assert Article.objects.filter(author=authors[2]).count() == 0
+    assert Press.objects.count() == 1
+
+    authors[2].delete(force_policy=SOFT_DELETE_CASCADE)
+    with override_settings(SAFE_DELETE_UNDELETE_ALL_RELATED=True):
+        authors[2].undelete(force_policy=SOFT_DELETE_CASCADE)
+    assert Article.objects.filter(author=authors[2]).count() == 1
@@ -1,13 +1,39 @@
 import itertools
+import sys
+from collections import OrderedDict, namedtuple
 
+from django.conf import settings
 from django.contrib.admin.utils import NestedObjects
-from django.db import router
+from django.db import models, router
+from django.db.models import Q
+from django.db.models.deletion import CASCADE, get_candidate_relations_to_delete
+
+from .dispatch import send_post_signal
+from .metrics import instrumented_iter
+
+DEFAULT_BATCH_SIZE = 1000
+
+# The async methods (see safedelete.aio) need the async/await syntax of Python 3.5.
+HAS_ASYNCIO = sys.version_info >= (3, 5)
+
+# Minimal stand-in for the instances expected by ``bulk_related_objects()``.
+PkRef = namedtuple('PkRef', ['pk'])
+
+INTEGER_FIELD_TYPES = frozenset((
+    'AutoField', 'BigAutoField', 'BigIntegerField', 'IntegerField',
+    'PositiveIntegerField', 'PositiveSmallIntegerField', 'SmallIntegerField',
+))
 
 
 def related_objects(obj):
     """ Return a generator to the objects that would be deleted if we delete "obj" (excluding obj) """
 
-    collector = NestedObjects(using=router.db_for_write(obj))
+    using = router.db_for_write(obj)
+    return instrumented_iter('related_objects', obj.__class__, using, _related_objects(obj, using))
+
+
+def _related_objects(obj, using):
+    collector = NestedObjects(using=using)
     collector.collect([obj])
 
     def flatten(elem):
@@ -17,8 +43,249 @@ def related_objects(obj):
             return (elem,)
         return ()
 
-    return flatten(collector.nested())
+    for elem in flatten(collector.nested()):
+        yield elem
+
+
+def related_pks(obj):
+    """Return a generator to the ``(model, pk)`` pairs of the objects that would be deleted if we delete "obj" (excluding obj).
+
+    Unlike :func:`related_objects`, the instances are never loaded and the
+    graph is walked lazily, depth first: each relation is read with
+    ``values_list('pk')`` queries paginated on the primary key by chunks of
+    ``SAFE_DELETE_BATCH_SIZE``, and the pairs are yielded as soon as they are
+    fetched. Only the primary keys already seen are kept in memory, to avoid
+    walking twice through the same objects.
+
+    Only ``CASCADE`` relations are followed, like the objects listed by
+    :func:`related_objects`. The parents of multi-table inherited models and
+    the generic relations are included.
+    """
+    using = router.db_for_write(obj)
+    seen = {obj._meta.concrete_model: {obj.pk}}
+    return instrumented_iter('related_pks', obj.__class__, using, _walk_related_pks(
+        obj.__class__, [obj.pk], True, using, seen, get_batch_size()
+    ))
+
+
+def _walk_related_pks(model, pks, collect_related, using, seen, batch_size):
+    for related_model, sub_pks, sub_collect_related in _related_pk_sources(model, pks, using, collect_related):
+        model_seen = seen.setdefault(related_model._meta.concrete_model, set())
+        if isinstance(sub_pks, list):
+            batches = chunks(sub_pks, batch_size)
+        else:
+            batches = keyset_pages(sub_pks, batch_size)
+        for batch in batches:
+            new_pks = [pk for pk in batch if pk not in model_seen]
+            model_seen.update(new_pks)
+            for pk in new_pks:
+                yield related_model, pk
+            if new_pks:
+                for item in _walk_related_pks(related_model, new_pks, sub_collect_related, using, seen, batch_size):
+                    yield item
+
+
+def keyset_pages(queryset, batch_size):
+    """Yield the primary keys of ``queryset`` as lists of at most ``batch_size`` items."""
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk = None
+    while True:
+        page_qs = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        page = list(page_qs[:batch_size])
+        if page:
+            yield page
+        if len(page) < batch_size:
+            return
+        last_pk = page[-1]
+
+
+def _related_pk_sources(model, pks, using, collect_related=True):
+    """Yield ``(model, pks, collect_related)`` for each relation of ``model`` deleted in cascade with ``pks``.
+
+    ``pks`` is either a list, or a QuerySet when it has to be paginated.
+    Mirrors :meth:`django.db.models.deletion.Collector.collect`: parents are
+    collected without their related objects, as those are found through the
+    child model fields.
+    """
+    for ptr in model._meta.concrete_model._meta.parents.values():
+        if ptr:
+            if ptr.primary_key:
+                parent_pks = pks
+            else:
+                parent_pks = list(model._base_manager.using(using).filter(
+                    pk__in=pks
+                ).values_list(ptr.attname, flat=True))
+            yield ptr.remote_field.model, parent_pks, False
+
+    if not collect_related:
+        return
+
+    for related in get_candidate_relations_to_delete(model._meta):
+        field = related.field
+        if field.remote_field.on_delete != CASCADE:
+            continue
+        yield related.related_model, related.related_model._base_manager.using(using).filter(
+            **{'%s__pk__in' % field.name: pks}
+        ), True
+
+    for field in model._meta.private_fields:
+        if hasattr(field, 'bulk_related_objects'):
+            # It's something like generic foreign key.
+            sub_objs = field.bulk_related_objects([PkRef(pk) for pk in pks], using)
+            yield sub_objs.model, sub_objs, True
+
+
+def iter_related_objects(obj):
+    """Streaming variant of :func:`related_objects`.
+
+    The ``(model, pk)`` pairs of :func:`related_pks` are loaded by chunks of
+    ``SAFE_DELETE_BATCH_SIZE`` per model, so the whole graph is never held in memory.
+    """
+    using = router.db_for_write(obj)
+    return instrumented_iter('iter_related_objects', obj.__class__, using, _iter_related_objects(obj, using))
+
+
+def _iter_related_objects(obj, using):
+    for model, pks in group_by_model(related_pks(obj), get_batch_size()):
+        for related in model._base_manager.using(using).filter(pk__in=pks):
+            yield related
+
+
+def group_by_model(pairs, batch_size):
+    """Buffer the ``(model, pk)`` pairs per model, yielding ``(model, pks)`` every ``batch_size`` pks and at the end."""
+    pending = OrderedDict()
+    for model, pk in pairs:
+        pks = pending.setdefault(model, [])
+        pks.append(pk)
+        if len(pks) >= batch_size:
+            yield model, pending.pop(model)
+    for model, pks in pending.items():
+        yield model, pks
 
 
 def can_hard_delete(obj):
-    return not bool(list(related_objects(obj)))
+    """Return whether deleting "obj" would not delete any other object.
+
+    Stops at the first dependent row found: each relation followed by
+    :func:`related_pks` is probed with one ``EXISTS`` query, multi-table
+    parents first as they need no query, then foreign keys, then generic relations.
+    """
+    using = router.db_for_write(obj)
+    for model, pks, collect_related in _related_pk_sources(obj.__class__, [obj.pk], using):
+        if isinstance(pks, list):
+            if pks:
+                return False
+        elif pks.exists():
+            return False
+    return True
+
+
+def dependents_filter(model, using, skip_auto_created=False):
+    """Return a ``Q`` object matching the objects of ``model`` that :func:`can_hard_delete` refuses.
+
+    Each relation followed by :func:`related_pks` becomes a ``pk__in``
+    subquery, so a QuerySet can be split between the objects with and without
+    dependents in SQL. Returns ``None`` when it cannot be expressed, i.e. for
+    a generic relation whose object id cannot be compared to the primary key.
+
+    With ``skip_auto_created``, the rows of the auto-created many-to-many
+    through tables are not considered as dependents.
+    """
+    if model._meta.concrete_model._meta.parents:
+        # The parents are always deleted with the object.
+        return Q(pk__isnull=False)
+
+    dependents = Q(pk__in=[])
+    for related in get_candidate_relations_to_delete(model._meta):
+        field = related.field
+        if field.remote_field.on_delete != CASCADE:
+            continue
+        if skip_auto_created and related.related_model._meta.auto_created:
+            continue
+        dependents |= Q(pk__in=related.related_model._base_manager.using(using).filter(
+            **{'%s__isnull' % field.name: False}
+        ).values('%s__pk' % field.name))
+
+    pk_type = model._meta.pk.get_internal_type()
+    for field in model._meta.private_fields:
+        if hasattr(field, 'bulk_related_objects'):
+            object_id_field = field.remote_field.model._meta.get_field(field.object_id_field_name)
+            id_type = object_id_field.get_internal_type()
+            if id_type != pk_type and not {id_type, pk_type} <= INTEGER_FIELD_TYPES:
+                return None
+            # It's something like generic foreign key.
+            dependents |= Q(pk__in=field.remote_field.model._base_manager.using(using).filter(**{
+                '%s__pk' % field.content_type_field_name: field.get_content_type().pk,
+                '%s__isnull' % field.object_id_field_name: False,
+            }).values(field.object_id_field_name))
+    return dependents
+
+
+def get_batch_size():
+    """Return the number of rows handled per query by bulk operations.
+
+    Configurable through the ``SAFE_DELETE_BATCH_SIZE`` setting.
+    """
+    return getattr(settings, 'SAFE_DELETE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+
+def chunks(objs, size):
+    """Split the ``objs`` list into lists of at most ``size`` items."""
+    for i in range(0, len(objs), size):
+        yield objs[i:i + size]
+
+
+def has_receivers(model, *signals):
+    """Return whether receivers of any of the ``signals`` are connected for ``model``.
+
+    The signals use ``use_caching=True``, so this is a dictionary lookup once
+    the receivers of ``model`` are known. ``None`` signals are ignored.
+    """
+    return any(signal is not None and signal.has_listeners(model) for signal in signals)
+
+
+def bulk_set_deleted(model, objs, deleted, using, pre_signal=None, post_signal=None,
+                     pre_batch_signal=None, post_batch_signal=None):
+    """Write ``deleted`` on the given objects of ``model`` with a single ``UPDATE`` query.
+
+    Args:
+        model: Model class of the objects.
+        objs: Instances to update, their ``deleted`` attribute is updated too.
+            Primary keys can be given instead when no receiver of the
+            per-instance signals is connected, see :func:`has_receivers`.
+        deleted: Value to write, ``None`` to undelete.
+        using: Database alias.
+        pre_signal: Signal sent for each instance before the query. (default: {None})
+        post_signal: Signal sent for each instance after the query. (default: {None})
+        pre_batch_signal: Signal sent once before the query. (default: {None})
+        post_batch_signal: Signal sent once after the query. (default: {None})
+
+    The batch signals get the ``pks`` list and ``using``, plus ``deleted``
+    unless undeleting. The post signals may be deferred, see :mod:`safedelete.dispatch`.
+
+    Returns the number of updated rows.
+    """
+    if objs and isinstance(objs[0], models.Model):
+        instances = objs
+        pks = [obj.pk for obj in objs]
+    else:
+        instances = ()
+        pks = list(objs)
+    batch_kwargs = {'pks': pks, 'using': using}
+    if deleted is not None:
+        batch_kwargs['deleted'] = deleted
+
+    if has_receivers(model, pre_batch_signal):
+        pre_batch_signal.send(sender=model, **batch_kwargs)
+    send_pre = has_receivers(model, pre_signal)
+    for obj in instances:
+        obj.deleted = deleted
+        if send_pre:
+            pre_signal.send(sender=model, instance=obj, using=using)
+    count = model._base_manager.using(using).filter(pk__in=pks).update(deleted=deleted)
+    if has_receivers(model, post_signal):
+        for obj in instances:
+            send_post_signal(post_signal, model, using, instance=obj)
+    if has_receivers(model, post_batch_signal):
+        send_post_signal(post_batch_signal, model, **batch_kwargs)
+    return count